@@ -0,0 +1,46 @@
+import logging
+import os
+from pathlib import Path
+import sys
+from typing import Iterator
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ultra_trainer.strava_mcp_server import server
+
+
+@pytest.fixture(scope="session")
+def strava_client() -> Iterator[server.StravaClient]:
+    """One real Strava client per test run so token refresh and TLS setup happen once."""
+    refresh_token = os.getenv("STRAVA_REFRESH_TOKEN")
+    client_id = os.getenv("STRAVA_CLIENT_ID")
+    client_secret = os.getenv("STRAVA_CLIENT_SECRET")
+
+    missing = [
+        name
+        for name, value in [
+            ("STRAVA_REFRESH_TOKEN", refresh_token),
+            ("STRAVA_CLIENT_ID", client_id),
+            ("STRAVA_CLIENT_SECRET", client_secret),
+        ]
+        if not value
+    ]
+
+    if missing:
+        error_message = f"Strava credentials not configured: missing {', '.join(missing)}"
+        logging.error("Missing Strava env vars: %s", ", ".join(missing))
+        pytest.fail(error_message)
+
+    # Let the client handle token refresh itself
+    client = server.StravaClient(refresh_token, client_id, client_secret)
+    yield client
+    client.close()
+
+
+@pytest.fixture(autouse=True)
+def _restore_strava_client() -> Iterator[None]:
+    """Keep tests from leaking their server.strava_client assignment."""
+    previous = server.strava_client
+    yield
+    server.strava_client = previous
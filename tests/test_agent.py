@@ -0,0 +1,140 @@
+import asyncio
+from pathlib import Path
+import sys
+from typing import Iterator
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ultra_trainer import agent
+from ultra_trainer.strava_mcp_server import server
+
+
+@pytest.fixture(autouse=True)
+def _empty_strava_cache() -> Iterator[None]:
+    """Start every test with no cached or in-flight Strava results."""
+    agent._strava_cache.clear()
+    agent._strava_inflight.clear()
+    yield
+    agent._strava_cache.clear()
+    agent._strava_inflight.clear()
+
+
+def test_concurrent_identical_calls_share_one_fetch(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = []
+
+    async def aget_activities(limit: int = 10) -> dict:
+        calls.append(limit)
+        await asyncio.sleep(0.01)
+        return {"data": [{"id": 1}]}
+
+    monkeypatch.setattr(server, "aget_activities", aget_activities)
+    tool = agent.StravaGetActivitiesTool()
+
+    async def run_both() -> list:
+        return await asyncio.gather(tool._arun(limit=5), tool._arun(limit=5))
+
+    first, second = asyncio.run(run_both())
+
+    assert calls == [5]
+    assert first == second == {"data": [{"id": 1}]}
+    assert agent._strava_inflight == {}
+
+
+def test_concurrent_waiters_share_a_failed_fetch(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = []
+
+    async def aget_activities(limit: int = 10) -> dict:
+        calls.append(limit)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(server, "aget_activities", aget_activities)
+    tool = agent.StravaGetActivitiesTool()
+
+    async def run_both() -> list:
+        return await asyncio.gather(tool._arun(limit=5), tool._arun(limit=5))
+
+    results = asyncio.run(run_both())
+
+    assert calls == [5]
+    assert all("boom" in result["error"] for result in results)
+    assert agent._strava_inflight == {}
+
+
+def test_error_results_are_fetched_again(monkeypatch: pytest.MonkeyPatch) -> None:
+    responses = iter([{"error": "Strava unavailable"}, {"data": []}, {"data": [{"id": 2}]}])
+    monkeypatch.setattr(server, "get_activities", lambda limit: next(responses))
+    tool = agent.StravaGetActivitiesTool()
+
+    assert tool._run(limit=3) == {"error": "Strava unavailable"}
+    assert tool._run(limit=3) == {"data": []}
+    # Successful results are served from the cache
+    assert tool._run(limit=3) == {"data": []}
+
+
+def test_async_error_results_are_fetched_again(monkeypatch: pytest.MonkeyPatch) -> None:
+    responses = iter([{"error": "Strava unavailable"}, {"data": []}])
+
+    async def aget_activities(limit: int = 10) -> dict:
+        return next(responses)
+
+    monkeypatch.setattr(server, "aget_activities", aget_activities)
+    tool = agent.StravaGetActivitiesTool()
+
+    assert asyncio.run(tool._arun(limit=3)) == {"error": "Strava unavailable"}
+    assert asyncio.run(tool._arun(limit=3)) == {"data": []}
+
+
+def _activity_by_id(activity_id: int) -> dict:
+    if activity_id == 2:
+        raise RuntimeError("not found")
+    return {"id": activity_id, "name": f"Run {activity_id}"}
+
+
+def test_batch_tool_reports_errors_per_activity(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "get_activity_by_id", _activity_by_id)
+
+    result = agent.StravaGetActivitiesByIdsTool()._run(activity_ids=[1, 2, 3])
+
+    activities = result["activities"]
+    assert [activity["id"] for activity in activities] == [1, 2, 3]
+    assert activities[0]["name"] == "Run 1"
+    assert "not found" in activities[1]["error"]
+    assert activities[2]["name"] == "Run 3"
+
+
+def test_async_batch_tool_reports_errors_per_activity(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def aget_activity_by_id(activity_id: int) -> dict:
+        return _activity_by_id(activity_id)
+
+    monkeypatch.setattr(server, "aget_activity_by_id", aget_activity_by_id)
+
+    result = asyncio.run(agent.StravaGetActivitiesByIdsTool()._arun(activity_ids=[1, 2, 3]))
+
+    activities = result["activities"]
+    assert [activity["id"] for activity in activities] == [1, 2, 3]
+    assert "not found" in activities[1]["error"]
+    assert "error" not in activities[2]
+
+
+def test_batch_tool_reports_invalid_id_lists_to_the_llm() -> None:
+    tool = agent.StravaGetActivitiesByIdsTool()
+
+    too_many = tool.invoke({"activity_ids": list(range(30))})
+    assert "at most 25" in too_many
+    assert "at least 1" in tool.invoke({"activity_ids": []})
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["2025-10-15", "2025-10-15T08:00", "2025-10-15 08:00:00", "2025-10-15T08:00:00Z",
+     "2025-10-15T08:00:00+02:00", "2025-10-15T08:00:00.123456"],
+)
+def test_iso_date_pre_check_accepts_fromisoformat_dates(value: str) -> None:
+    assert agent._ISO_DATE_RE.match(value)
+
+
+@pytest.mark.parametrize("value", ["15/10/2025", "next friday", "2025-10-15T8:00"])
+def test_iso_date_pre_check_rejects_malformed_dates(value: str) -> None:
+    assert not agent._ISO_DATE_RE.match(value)
@@ -0,0 +1,216 @@
+from pathlib import Path
+import sqlite3
+import sys
+import threading
+
+import pytest
+from sqlalchemy import text
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ultra_trainer.context_store import ContextStore
+
+
+def test_file_database_uses_wal(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+
+    with store.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        # 1 == NORMAL
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+
+
+def test_in_memory_database_skips_wal() -> None:
+    store = ContextStore("sqlite:///:memory:")
+
+    with store.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "memory"
+
+
+def test_context_summary_reads_all_sections(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+    store.upsert_profile(birth_year=1985)
+    store.add_or_update_goal(event_name="UTMB")
+    store.log_episode(topic="injury", narrative="sore calf", severity=3)
+    store.add_convo_turn("user", "hello")
+
+    summary = store.get_context_summary()
+
+    assert summary["profile"]["birth_year"] == 1985
+    assert [goal["event_name"] for goal in summary["active_goals"]] == ["UTMB"]
+    assert [episode["topic"] for episode in summary["current_episodes"]] == ["injury"]
+    assert [turn["text"] for turn in summary["recent_conversations"]] == ["hello"]
+
+
+def test_add_convo_turns_inserts_in_order(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+
+    turn_ids = store.add_convo_turns([("user", "How was my week?"), ("agent", "Solid.")])
+    turn_ids.append(store.add_convo_turn("user", "And next week?"))
+
+    turns = store.last_n_turns(10)
+    assert [turn["turn_id"] for turn in turns] == turn_ids
+    assert [(turn["speaker"], turn["text"]) for turn in turns] == [
+        ("user", "How was my week?"),
+        ("agent", "Solid."),
+        ("user", "And next week?"),
+    ]
+    assert all(turn["timestamp"] for turn in turns)
+
+
+def test_last_n_turns_filters_by_session(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+    store.add_convo_turns([("user", "mine"), ("agent", "reply")], session_id="a")
+    store.add_convo_turn("user", "theirs", session_id="b")
+
+    assert [turn["text"] for turn in store.last_n_turns(10, session_id="a")] == ["mine", "reply"]
+    assert [turn["text"] for turn in store.last_n_turns(10)] == ["mine", "reply", "theirs"]
+
+
+def test_existing_database_gets_new_indexes(tmp_path: Path) -> None:
+    db_path = tmp_path / "store.db"
+    ContextStore(f"sqlite:///{db_path}")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP INDEX ix_convo_history_timestamp")
+
+    ContextStore(f"sqlite:///{db_path}")
+
+    with sqlite3.connect(db_path) as conn:
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "ix_convo_history_timestamp" in indexes
+
+
+def test_speaker_is_stored_as_integer(tmp_path: Path) -> None:
+    db_path = tmp_path / "store.db"
+    store = ContextStore(f"sqlite:///{db_path}")
+    store.add_convo_turns([("user", "hi"), ("agent", "hello")])
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT speaker FROM convo_history ORDER BY turn_id").fetchall() == [(0,), (1,)]
+    with pytest.raises(ValueError):
+        store.add_convo_turn("coach", "hm")
+
+
+def test_legacy_string_speakers_still_read(tmp_path: Path) -> None:
+    db_path = tmp_path / "store.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE convo_history (turn_id INTEGER PRIMARY KEY, speaker VARCHAR(50) NOT NULL, "
+            "text TEXT NOT NULL, timestamp DATETIME)"
+        )
+        conn.execute("INSERT INTO convo_history VALUES (1, 'user', 'hi', '2024-01-01 00:00:00')")
+        conn.execute("INSERT INTO convo_history VALUES (2, 'assistant', 'hey', '2024-01-01 00:00:01')")
+
+    store = ContextStore(f"sqlite:///{db_path}")
+    store.add_convo_turn("agent", "hello")
+
+    assert [(turn["speaker"], turn["text"]) for turn in store.last_n_turns(10)] == [
+        ("user", "hi"),
+        ("assistant", "hey"),
+        ("agent", "hello"),
+    ]
+    assert [turn["speaker"] for turn in store.get_context_summary()["recent_conversations"]] == [
+        "user", "assistant", "agent"
+    ]
+
+
+def test_clear_old_conversations_returns_deleted_count(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+    store.add_convo_turns([("user", "old"), ("agent", "older")])
+    with store.engine.begin() as conn:
+        conn.execute(text("UPDATE convo_history SET timestamp = '2000-01-01 00:00:00'"))
+    store.add_convo_turn("user", "new")
+
+    assert store.clear_old_conversations(days_to_keep=30) == 2
+    assert [turn["text"] for turn in store.last_n_turns(10)] == ["new"]
+
+
+def test_profile_cache_is_dropped_on_update(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+    assert store.get_profile() is None
+
+    store.upsert_profile(current_location="Copenhagen")
+    assert store.get_profile()["current_location"] == "Copenhagen"
+
+    store.get_profile()["current_location"] = "mutated"
+    assert store.get_profile()["current_location"] == "Copenhagen"
+
+    store.upsert_profile(weight_kg=70.5)
+    profile = store.get_profile()
+    assert profile["current_location"] == "Copenhagen"
+    assert profile["weight_kg"] == 70.5
+
+
+def test_profile_read_racing_an_update_is_not_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+    store.upsert_profile(current_location="Copenhagen")
+    read_profile = store._get_profile
+
+    def read_then_update(session):
+        profile = read_profile(session)
+        # An update commits after the row was read but before it is cached
+        store.upsert_profile(current_location="Boulder")
+        return profile
+
+    monkeypatch.setattr(store, "_get_profile", read_then_update)
+    assert store.get_profile()["current_location"] == "Copenhagen"
+    monkeypatch.undo()
+
+    assert store.get_profile()["current_location"] == "Boulder"
+
+
+def test_concurrent_writers_do_not_fail(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+    errors = []
+
+    def write(worker: int) -> None:
+        try:
+            for i in range(20):
+                store.add_convo_turn("user", f"{worker}-{i}")
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(store.last_n_turns(100)) == 80
+
+
+def test_context_summary_is_cached_until_next_write(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+    first = store.get_context_summary()
+    assert store.get_context_summary() is first
+
+    store.add_convo_turn("user", "hello")
+
+    refreshed = store.get_context_summary()
+    assert refreshed is not first
+    assert [turn["text"] for turn in refreshed["recent_conversations"]] == ["hello"]
+
+
+def test_transaction_commits_turn_and_episode_together(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+
+    turn_id, episode_id = store.log_turn_and_episode(
+        speaker="user", text="Legs are heavy", topic="fatigue", severity=6
+    )
+
+    assert [turn["turn_id"] for turn in store.last_n_turns(10)] == [turn_id]
+    episodes = store.current_episodes("fatigue")
+    assert [(episode["episode_id"], episode["narrative_text"]) for episode in episodes] == [
+        (episode_id, "Legs are heavy")
+    ]
+
+
+def test_transaction_rolls_back_on_error(tmp_path: Path) -> None:
+    store = ContextStore(f"sqlite:///{tmp_path / 'store.db'}")
+
+    with pytest.raises(RuntimeError):
+        with store.transaction() as tx:
+            tx.add_convo_turn("user", "lost")
+            raise RuntimeError("boom")
+
+    assert store.last_n_turns(10) == []
@@ -1,9 +1,10 @@
 import asyncio
-import logging
-import os
+import json
 from pathlib import Path
 import sys
+import time
 
+import httpx
 import pytest
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -11,31 +12,8 @@ from ultra_trainer.strava_mcp_server import server
 
 
 @pytest.mark.integration
-def test_get_activities_returns_data() -> None:
-    refresh_token = os.getenv("STRAVA_REFRESH_TOKEN")
-    client_id = os.getenv("STRAVA_CLIENT_ID")
-    client_secret = os.getenv("STRAVA_CLIENT_SECRET")
-
-    missing = [
-        name
-        for name, value in [
-            ("STRAVA_REFRESH_TOKEN", refresh_token),
-            ("STRAVA_CLIENT_ID", client_id),
-            ("STRAVA_CLIENT_SECRET", client_secret),
-        ]
-        if not value
-    ]
-
-    if missing:
-        error_message = f"Strava credentials not configured: missing {', '.join(missing)}"
-        logging.error("Missing Strava env vars: %s", ", ".join(missing))
-        pytest.fail(error_message)
-
-    # Initialize the Strava client and let it handle token refresh
-    server.strava_client = server.StravaClient(
-        refresh_token, client_id, client_secret
-    )
-    # Don't manually set access_token and expires_at - let the client refresh automatically
+def test_get_activities_returns_data(strava_client: server.StravaClient) -> None:
+    server.strava_client = strava_client
 
     blocks, payload = asyncio.run(
         server.mcp.call_tool("get_activities", {"limit": 1})
@@ -46,3 +24,112 @@ def test_get_activities_returns_data() -> None:
 
     assert "data" in payload
     assert isinstance(payload["data"], list)
+
+
+def test_client_reuses_cached_token(tmp_path: Path) -> None:
+    cache_path = tmp_path / "token.json"
+    cache_path.write_text(json.dumps({"access_token": "cached", "expires_at": int(time.time()) + 3600}))
+
+    client = server.StravaClient("refresh", "id", "secret", token_cache_path=cache_path)
+    try:
+        assert client.access_token == "cached"
+    finally:
+        client.close()
+
+
+def test_client_ignores_nearly_expired_cached_token(tmp_path: Path) -> None:
+    cache_path = tmp_path / "token.json"
+    cache_path.write_text(json.dumps({"access_token": "stale", "expires_at": int(time.time()) + 60}))
+
+    client = server.StravaClient("refresh", "id", "secret", token_cache_path=cache_path)
+    try:
+        assert client.access_token is None
+    finally:
+        client.close()
+
+
+def test_saved_token_is_owner_only(tmp_path: Path) -> None:
+    cache_path = tmp_path / "token.json"
+    (tmp_path / "token.tmp").write_text("leftover")
+    (tmp_path / "token.tmp").chmod(0o644)
+
+    client = server.StravaClient("refresh", "id", "secret", token_cache_path=cache_path)
+    try:
+        client.access_token = "fresh"
+        client.expires_at = int(time.time()) + 3600
+        client._save_cached_token()
+    finally:
+        client.close()
+
+    assert json.loads(cache_path.read_text())["access_token"] == "fresh"
+    assert cache_path.stat().st_mode & 0o777 == 0o600
+
+
+def _mock_client(tmp_path: Path, handler) -> server.StravaClient:
+    """A client with a valid token whose requests are answered by handler."""
+    client = server.StravaClient("refresh", "id", "secret", token_cache_path=tmp_path / "token.json")
+    client.access_token = "token"
+    client.expires_at = int(time.time()) + 3600
+    client.client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_make_request_retries_rate_limited_response(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "1"}),
+        httpx.Response(200, json=[], headers={"X-RateLimit-Usage": "10,100", "X-RateLimit-Limit": "200,2000"}),
+    ])
+    client = _mock_client(tmp_path, lambda request: next(responses))
+    # Record the delay the client chose, but retry without actually waiting
+    delays = []
+    retry_delay = client._retry_delay
+
+    def record_delay(response: httpx.Response, attempt: int) -> float:
+        delays.append(retry_delay(response, attempt))
+        return 0.0
+
+    monkeypatch.setattr(client, "_retry_delay", record_delay)
+    try:
+        assert client.get_activities(limit=1) == []
+        assert delays == [1.0]
+        status = client.get_rate_limit_status()
+        assert status["short_term_usage"] == 10
+        assert status["daily_limit"] == 2000
+    finally:
+        client.close()
+
+
+def test_make_request_fails_fast_when_short_term_limit_is_spent(tmp_path: Path) -> None:
+    requests = []
+    headers = {"X-RateLimit-Usage": "199,300", "X-RateLimit-Limit": "200,2000"}
+    client = _mock_client(
+        tmp_path, lambda request: requests.append(request) or httpx.Response(200, json=[], headers=headers)
+    )
+    try:
+        assert client.get_activities(limit=1) == []
+        # Far enough from the next 15-minute boundary that waiting would exceed the cap
+        client._short_reset = time.time() + 300
+        with pytest.raises(Exception, match="15-minute rate limit"):
+            client.get_activities(limit=1)
+        assert len(requests) == 1
+    finally:
+        client.close()
+
+
+def test_make_request_fails_fast_on_long_retry_after(tmp_path: Path) -> None:
+    requests = []
+    client = _mock_client(
+        tmp_path, lambda request: requests.append(request) or httpx.Response(429, headers={"Retry-After": "900"})
+    )
+    try:
+        with pytest.raises(Exception, match="try again in 16 minutes"):
+            client.get_activities(limit=1)
+        assert len(requests) == 1
+    finally:
+        client.close()
+
+
+def test_mcp_recent_activities_tool_only_takes_days_and_limit() -> None:
+    tools = {tool.name: tool for tool in asyncio.run(server.mcp.list_tools())}
+
+    assert set(tools["get_recent_activities"].inputSchema["properties"]) == {"days", "limit"}
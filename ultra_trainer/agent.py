@@ -2,42 +2,176 @@
 """
 LangChain Agent for Ultra Trainer
 
-This module initializes a LangChain agent that connects OpenAI's GPT-4o model
+This module initializes a LangChain agent that connects an OpenAI chat model
 with Strava MCP tools and persistent data store for ultra marathon training assistance.
 """
 
+import asyncio
+import functools
 import os
 import json
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Type, Optional
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, Type, Optional
 
 from dotenv import load_dotenv
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain.tools import BaseTool, tool
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 
 from ultra_trainer.strava_mcp_server import server
 from ultra_trainer.context_store import ContextStore
 from ultra_trainer.prompts import create_agent_prompt
 
-# Load environment variables
-load_dotenv()
+_dotenv_loaded = False
+
+
+def _load_env() -> None:
+    """Load .env once, on first use rather than at import time."""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        load_dotenv(override=False)
+        _dotenv_loaded = True
+
+
+@functools.lru_cache(maxsize=1)
+def _strava_credentials() -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Read the Strava credentials once, after .env has been loaded."""
+    _load_env()
+    return (
+        os.getenv("STRAVA_REFRESH_TOKEN"),
+        os.getenv("STRAVA_CLIENT_ID"),
+        os.getenv("STRAVA_CLIENT_SECRET"),
+    )
+
+
+_store: Optional[ContextStore] = None
+_store_lock = threading.Lock()
 
 
 def get_store() -> ContextStore:
-    """Get a context store instance."""
-    return ContextStore()
+    """Get the shared context store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ContextStore()
+    return _store
+
+
+# ------ Strava Result Cache ------
+
+STRAVA_CACHE_MAXSIZE = 256
+ACTIVITY_LIST_TTL_SECONDS = 1800  # Activity lists change as new runs are uploaded
+ACTIVITY_DETAIL_TTL_SECONDS = 86400  # Details of a recorded activity are effectively immutable
+# Matches the Strava client's connection pool size
+ACTIVITY_BATCH_WORKERS = 8
+
+_strava_cache: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_strava_cache_lock = threading.Lock()
+# Fetches currently in flight, so concurrent identical calls share one request
+_strava_inflight: Dict[Tuple, "asyncio.Future[Dict[str, Any]]"] = {}
+
+
+def _get_cached(key: Tuple) -> Optional[Dict[str, Any]]:
+    """Return an unexpired cache entry for key, or None."""
+    with _strava_cache_lock:
+        entry = _strava_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _strava_cache.move_to_end(key)
+            return entry[1]
+    return None
+
+
+def _store_cached(key: Tuple, ttl: float, result: Dict[str, Any]) -> None:
+    """Store a successful result, evicting the least recently used entries."""
+    if "error" in result:
+        return
+    with _strava_cache_lock:
+        _strava_cache[key] = (time.monotonic() + ttl, result)
+        _strava_cache.move_to_end(key)
+        while len(_strava_cache) > STRAVA_CACHE_MAXSIZE:
+            _strava_cache.popitem(last=False)
+
+
+def cached_strava_call(
+    key: Tuple, ttl: float, fetch: Callable[[], Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Return the cached result for key, calling fetch on a miss or expiry.
+    Error results are never cached so transient failures are retried.
+    """
+    cached = _get_cached(key)
+    if cached is not None:
+        return cached
+
+    result = fetch()
+    _store_cached(key, ttl, result)
+    return result
+
+
+async def acached_strava_call(
+    key: Tuple, ttl: float, fetch: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    Async variant of cached_strava_call.
+    Concurrent calls for the same key wait for the first fetch instead of
+    issuing their own request.
+    """
+    cached = _get_cached(key)
+    if cached is not None:
+        return cached
+
+    loop = asyncio.get_running_loop()
+    pending = _strava_inflight.get(key)
+    if pending is not None and pending.get_loop() is loop:
+        return await asyncio.shield(pending)
+
+    future = loop.create_future()
+    _strava_inflight[key] = future
+    try:
+        result = await fetch()
+        _store_cached(key, ttl, result)
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved in case nobody else was waiting
+        future.exception()
+        raise
+    finally:
+        if _strava_inflight.get(key) is future:
+            del _strava_inflight[key]
+
+
+def _date_range_ttl(end_date: str) -> float:
+    """Ranges that ended before today can no longer change, so keep them longer."""
+    try:
+        if date.fromisoformat(end_date) < date.today():
+            return ACTIVITY_DETAIL_TTL_SECONDS
+    except ValueError:
+        pass
+    return ACTIVITY_LIST_TTL_SECONDS
 
 
 class StravaToolInput(BaseModel):
     """Input schema for Strava tools."""
+    model_config = ConfigDict(frozen=True)
     limit: int = Field(default=10, description="Maximum number of activities to return")
 
 
 class StravaDateRangeToolInput(BaseModel):
     """Input schema for Strava date range tools."""
+    model_config = ConfigDict(frozen=True)
     start_date: str = Field(description="Start date in ISO format (YYYY-MM-DD)")
     end_date: str = Field(description="End date in ISO format (YYYY-MM-DD)")
     limit: int = Field(default=30, description="Maximum number of activities to return")
@@ -45,16 +179,43 @@ class StravaDateRangeToolInput(BaseModel):
 
 class StravaActivityToolInput(BaseModel):
     """Input schema for Strava activity tools."""
+    model_config = ConfigDict(frozen=True)
     activity_id: int = Field(description="ID of the activity to retrieve")
 
 
+class StravaActivityBatchInput(BaseModel):
+    """Input schema for batch Strava activity tools."""
+    model_config = ConfigDict(frozen=True)
+    activity_ids: List[int] = Field(
+        min_length=1, max_length=25, description="IDs of the activities to retrieve"
+    )
+
+
 class StravaRecentToolInput(BaseModel):
     """Input schema for Strava recent activities tools."""
+    model_config = ConfigDict(frozen=True)
     days: int = Field(default=7, description="Number of days to look back")
     limit: int = Field(default=10, description="Maximum number of activities to return")
 
 
-class StravaGetActivitiesTool(BaseTool):
+def _validation_error_message(error: ValidationError) -> str:
+    """Summarize invalid tool arguments for the LLM, e.g. too many activity IDs."""
+    problems = "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+    return f"Invalid tool input ({problems}). Fix the arguments and try again."
+
+
+class StravaBaseTool(BaseTool):
+    """Base for the Strava tools."""
+    
+    # Report ToolExceptions and invalid arguments back to the LLM instead of
+    # aborting the agent run
+    handle_tool_error: bool = True
+    handle_validation_error: Callable[[ValidationError], str] = _validation_error_message
+
+
+class StravaGetActivitiesTool(StravaBaseTool):
     """LangChain tool wrapper for Strava get_activities MCP function."""
     
     name: str = "get_strava_activities"
@@ -64,12 +225,27 @@ class StravaGetActivitiesTool(BaseTool):
     def _run(self, limit: int = 10) -> Dict[str, Any]:
         """Execute the tool."""
         try:
-            return server.get_activities(limit=limit)
+            return cached_strava_call(
+                (self.name, limit),
+                ACTIVITY_LIST_TTL_SECONDS,
+                lambda: server.get_activities(limit=limit),
+            )
         except Exception as e:
             return {"error": f"Failed to get activities: {str(e)}"}
 
+    async def _arun(self, limit: int = 10) -> Dict[str, Any]:
+        """Execute the tool without blocking the event loop."""
+        try:
+            return await acached_strava_call(
+                (self.name, limit),
+                ACTIVITY_LIST_TTL_SECONDS,
+                lambda: server.aget_activities(limit=limit),
+            )
+        except Exception as e:
+            return {"error": f"Failed to get activities: {str(e)}"}
 
-class StravaGetActivitiesByDateRangeTool(BaseTool):
+
+class StravaGetActivitiesByDateRangeTool(StravaBaseTool):
     """LangChain tool wrapper for Strava get_activities_by_date_range MCP function."""
     
     name: str = "get_strava_activities_by_date_range"
@@ -79,31 +255,116 @@ class StravaGetActivitiesByDateRangeTool(BaseTool):
     def _run(self, start_date: str, end_date: str, limit: int = 30) -> Dict[str, Any]:
         """Execute the tool."""
         try:
-            return server.get_activities_by_date_range(
-                start_date=start_date, 
-                end_date=end_date, 
-                limit=limit
+            return cached_strava_call(
+                (self.name, start_date, end_date, limit),
+                _date_range_ttl(end_date),
+                lambda: server.get_activities_by_date_range(
+                    start_date=start_date,
+                    end_date=end_date,
+                    limit=limit
+                ),
+            )
+        except Exception as e:
+            return {"error": f"Failed to get activities by date range: {str(e)}"}
+
+    async def _arun(self, start_date: str, end_date: str, limit: int = 30) -> Dict[str, Any]:
+        """Execute the tool without blocking the event loop."""
+        try:
+            return await acached_strava_call(
+                (self.name, start_date, end_date, limit),
+                _date_range_ttl(end_date),
+                lambda: server.aget_activities_by_date_range(
+                    start_date=start_date,
+                    end_date=end_date,
+                    limit=limit
+                ),
             )
         except Exception as e:
             return {"error": f"Failed to get activities by date range: {str(e)}"}
 
 
-class StravaGetActivityByIdTool(BaseTool):
+def _fetch_activity(activity_id: int) -> Dict[str, Any]:
+    """Fetch one activity's details, shared by the single and batch tools' cache."""
+    return cached_strava_call(
+        ("get_strava_activity_by_id", activity_id),
+        ACTIVITY_DETAIL_TTL_SECONDS,
+        lambda: server.get_activity_by_id(activity_id=activity_id),
+    )
+
+
+async def _afetch_activity(activity_id: int) -> Dict[str, Any]:
+    """Async variant of _fetch_activity."""
+    return await acached_strava_call(
+        ("get_strava_activity_by_id", activity_id),
+        ACTIVITY_DETAIL_TTL_SECONDS,
+        lambda: server.aget_activity_by_id(activity_id=activity_id),
+    )
+
+
+class StravaGetActivityByIdTool(StravaBaseTool):
     """LangChain tool wrapper for Strava get_activity_by_id MCP function."""
     
     name: str = "get_strava_activity_by_id"
-    description: str = "Get detailed information about a specific activity from Strava"
+    description: str = (
+        "Get detailed information about a specific activity from Strava. "
+        "To look up several activities, use get_strava_activities_by_ids instead"
+    )
     args_schema: Type[BaseModel] = StravaActivityToolInput
     
     def _run(self, activity_id: int) -> Dict[str, Any]:
         """Execute the tool."""
         try:
-            return server.get_activity_by_id(activity_id=activity_id)
+            return _fetch_activity(activity_id)
         except Exception as e:
             return {"error": f"Failed to get activity by ID: {str(e)}"}
 
+    async def _arun(self, activity_id: int) -> Dict[str, Any]:
+        """Execute the tool without blocking the event loop."""
+        try:
+            return await _afetch_activity(activity_id)
+        except Exception as e:
+            return {"error": f"Failed to get activity by ID: {str(e)}"}
+
+
+class StravaGetActivitiesByIdsTool(StravaBaseTool):
+    """Fetch details for several activities in one tool call."""
+    
+    name: str = "get_strava_activities_by_ids"
+    description: str = (
+        "Get detailed information about several Strava activities at once "
+        "(up to 25 IDs). Prefer this over repeated get_strava_activity_by_id calls"
+    )
+    args_schema: Type[BaseModel] = StravaActivityBatchInput
+    
+    def _run(self, activity_ids: List[int]) -> Dict[str, Any]:
+        """Execute the tool."""
+        with ThreadPoolExecutor(max_workers=ACTIVITY_BATCH_WORKERS) as executor:
+            results = list(executor.map(self._fetch_one, activity_ids))
+        return {"activities": results}
+
+    async def _arun(self, activity_ids: List[int]) -> Dict[str, Any]:
+        """Execute the tool without blocking the event loop."""
+        results = await asyncio.gather(
+            *(self._afetch_one(activity_id) for activity_id in activity_ids)
+        )
+        return {"activities": list(results)}
+
+    @staticmethod
+    def _fetch_one(activity_id: int) -> Dict[str, Any]:
+        try:
+            return _fetch_activity(activity_id)
+        except Exception as e:
+            return {"id": activity_id, "error": f"Failed to get activity by ID: {str(e)}"}
 
-class StravaGetRecentActivitiesTool(BaseTool):
+    @staticmethod
+    async def _afetch_one(activity_id: int) -> Dict[str, Any]:
+        try:
+            return await _afetch_activity(activity_id)
+        except Exception as e:
+            return {"id": activity_id, "error": f"Failed to get activity by ID: {str(e)}"}
+
+
+class StravaGetRecentActivitiesTool(StravaBaseTool):
     """LangChain tool wrapper for Strava get_recent_activities MCP function."""
     
     name: str = "get_strava_recent_activities"
@@ -113,23 +374,83 @@ class StravaGetRecentActivitiesTool(BaseTool):
     def _run(self, days: int = 7, limit: int = 10) -> Dict[str, Any]:
         """Execute the tool."""
         try:
-            return server.get_recent_activities(days=days, limit=limit)
+            return cached_strava_call(
+                (self.name, days, limit),
+                ACTIVITY_LIST_TTL_SECONDS,
+                lambda: server.get_recent_activities(
+                    days=days, limit=limit, after=server.days_ago_timestamp(days)
+                ),
+            )
+        except Exception as e:
+            return {"error": f"Failed to get recent activities: {str(e)}"}
+
+    async def _arun(self, days: int = 7, limit: int = 10) -> Dict[str, Any]:
+        """Execute the tool without blocking the event loop."""
+        try:
+            return await acached_strava_call(
+                (self.name, days, limit),
+                ACTIVITY_LIST_TTL_SECONDS,
+                lambda: server.aget_recent_activities(
+                    days=days, limit=limit, after=server.days_ago_timestamp(days)
+                ),
+            )
         except Exception as e:
             return {"error": f"Failed to get recent activities: {str(e)}"}
 
 
+class StravaGetRateLimitStatusTool(StravaBaseTool):
+    """LangChain tool wrapper for Strava get_rate_limit_status MCP function."""
+    
+    name: str = "get_strava_rate_limit_status"
+    description: str = (
+        "Get current Strava API usage against its 15-minute and daily rate limits. "
+        "Check this before fetching many activities."
+    )
+    
+    def _run(self) -> Dict[str, Any]:
+        """Execute the tool."""
+        try:
+            return server.get_rate_limit_status()
+        except Exception as e:
+            return {"error": f"Failed to get rate limit status: {str(e)}"}
+
+    async def _arun(self) -> Dict[str, Any]:
+        """Execute the tool; it only reads in-memory counters, so no thread hop is needed."""
+        return self._run()
+
+
+# Tools are stateless, so they are built once and shared by every agent
+_STRAVA_TOOLS: List[BaseTool] = [
+    StravaGetActivitiesTool(),
+    StravaGetActivitiesByDateRangeTool(),
+    StravaGetActivityByIdTool(),
+    StravaGetActivitiesByIdsTool(),
+    StravaGetRecentActivitiesTool(),
+    StravaGetRateLimitStatusTool(),
+]
+
+
 def get_strava_tools() -> List[BaseTool]:
     """Get all Strava MCP tools wrapped as LangChain tools."""
-    return [
-        StravaGetActivitiesTool(),
-        StravaGetActivitiesByDateRangeTool(),
-        StravaGetActivityByIdTool(),
-        StravaGetRecentActivitiesTool(),
-    ]
+    return _STRAVA_TOOLS
 
 
 # ------ Data Store Tools ------
 
+# Extended-format ISO 8601 dates as accepted by datetime.fromisoformat: an
+# optional time (down to fractional seconds) and an optional Z or UTC offset
+_ISO_DATE_RE = re.compile(
+    r"^\d{4}-\d{2}-\d{2}"
+    r"(?:[T ]\d{2}(?::\d{2}(?::\d{2}(?:[.,]\d+)?)?)?"
+    r"(?:Z|[+-]\d{2}(?::?\d{2}(?::?\d{2}(?:\.\d+)?)?)?)?)?$"
+)
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a tool result as compact JSON; whitespace only costs the LLM tokens."""
+    return json.dumps(obj, default=str, separators=(",", ":"), ensure_ascii=False)
+
+
 @tool("profile")
 def profile_tool(
     birth_year: Optional[int] = None,
@@ -151,22 +472,27 @@ def profile_tool(
     """
     store = get_store()
     
-    # If any parameters provided, update profile
-    if any([birth_year, gender, history, weight_kg, running_years, 
-            preferred_terrain, weekly_mileage_km, ultra_experience,
-            current_location, default_location]):
-        store.upsert_profile(
-            birth_year=birth_year,
-            gender=gender,
-            history=history,
-            weight_kg=weight_kg,
-            running_years=running_years,
-            preferred_terrain=preferred_terrain,
-            weekly_mileage_km=weekly_mileage_km,
-            ultra_experience=ultra_experience,
-            current_location=current_location,
-            default_location=default_location
+    # Only pass the fields that were actually supplied
+    fields = {
+        name: value
+        for name, value in (
+            ("birth_year", birth_year),
+            ("gender", gender),
+            ("history", history),
+            ("weight_kg", weight_kg),
+            ("running_years", running_years),
+            ("preferred_terrain", preferred_terrain),
+            ("weekly_mileage_km", weekly_mileage_km),
+            ("ultra_experience", ultra_experience),
+            ("current_location", current_location),
+            ("default_location", default_location),
         )
+        if value is not None
+    }
+
+    # If any parameters provided, update profile
+    if fields:
+        store.upsert_profile(**fields)
         return "✅ Profile updated successfully."
     
     # Otherwise return current profile
@@ -174,7 +500,7 @@ def profile_tool(
     if prof is None:
         return "No profile found. You can create one by providing details like birth_year, weight_kg, etc."
     
-    return f"Current profile: {json.dumps(prof, default=str, indent=2)}"
+    return f"Current profile: {_dumps(prof)}"
 
 
 @tool("goals")
@@ -209,19 +535,27 @@ def goals_tool(
     if event_name:
         event_datetime = None
         if event_date:
+            # Reject malformed input up front; the try only catches
+            # well-shaped but impossible dates such as 2025-02-30
+            if not _ISO_DATE_RE.match(event_date):
+                return f"❌ Invalid date format. Use YYYY-MM-DD format, got: {event_date}"
             try:
                 # Parse ISO date string to datetime
                 event_datetime = datetime.fromisoformat(event_date).replace(tzinfo=timezone.utc)
             except ValueError:
                 return f"❌ Invalid date format. Use YYYY-MM-DD format, got: {event_date}"
         
-        goal_id = store.add_or_update_goal(
-            event_name=event_name,
-            distance_km=distance_km,
-            event_datetime=event_datetime,
-            context_text=context_text,
-            target_time_seconds=target_time_seconds
-        )
+        fields = {
+            name: value
+            for name, value in (
+                ("distance_km", distance_km),
+                ("event_datetime", event_datetime),
+                ("context_text", context_text),
+                ("target_time_seconds", target_time_seconds),
+            )
+            if value is not None
+        }
+        goal_id = store.add_or_update_goal(event_name=event_name, **fields)
         return f"✅ Goal '{event_name}' added successfully (ID: {goal_id})."
     
     # Otherwise return current goals
@@ -229,7 +563,27 @@ def goals_tool(
     if not goals:
         return "No active goals found. Add a goal by providing event_name and other details."
     
-    return f"Active goals: {json.dumps(goals, default=str, indent=2)}"
+    return f"Active goals: {_dumps(goals)}"
+
+
+def _end_episode(episode_id: int, label: str) -> str:
+    """Mark an episode resolved and describe the outcome."""
+    if get_store().end_episode(episode_id):
+        return f"✅ {label} episode {episode_id} marked as resolved."
+    return f"❌ Could not find {label.lower()} episode {episode_id}."
+
+
+def _log_episode(topic: str, label: str, description: str, severity: Optional[int]) -> str:
+    """Log a new episode and describe the outcome."""
+    episode_id = get_store().log_episode(topic=topic, narrative=description, severity=severity)
+    return f"✅ {label} logged successfully (Episode ID: {episode_id})."
+
+
+def _list_episodes(episodes: List[Dict[str, Any]], heading: str, empty_message: str) -> str:
+    """Format an episode list for the LLM."""
+    if not episodes:
+        return empty_message
+    return f"{heading}: {_dumps(episodes)}"
 
 
 @tool("injury")
@@ -246,26 +600,15 @@ def injury_tool(
     - severity: 1-10 scale (10 = severe)
     - end_injury: episode_id to mark an injury as resolved
     """
-    store = get_store()
-    
     if end_injury:
-        success = store.end_episode(end_injury)
-        return f"✅ Injury episode {end_injury} marked as resolved." if success else f"❌ Could not find injury episode {end_injury}."
-    
+        return _end_episode(end_injury, "Injury")
     if status == "new" and description:
-        episode_id = store.log_episode(
-            topic="injury",
-            narrative=description,
-            severity=severity
-        )
-        return f"✅ Injury logged successfully (Episode ID: {episode_id})."
-    
-    # Return current injuries
-    injuries = store.current_episodes(topic="injury")
-    if not injuries:
-        return "No current injuries recorded. Good news! 🎉"
-    
-    return f"Current injuries: {json.dumps(injuries, default=str, indent=2)}"
+        return _log_episode("injury", "Injury", description, severity)
+    return _list_episodes(
+        get_store().current_episodes(topic="injury"),
+        "Current injuries",
+        "No current injuries recorded. Good news! 🎉",
+    )
 
 
 @tool("fatigue")
@@ -282,26 +625,15 @@ def fatigue_tool(
     - severity: 1-10 scale (10 = extremely fatigued)
     - end_fatigue: episode_id to mark fatigue as resolved
     """
-    store = get_store()
-    
     if end_fatigue:
-        success = store.end_episode(end_fatigue)
-        return f"✅ Fatigue episode {end_fatigue} marked as resolved." if success else f"❌ Could not find fatigue episode {end_fatigue}."
-    
+        return _end_episode(end_fatigue, "Fatigue")
     if status == "new" and description:
-        episode_id = store.log_episode(
-            topic="fatigue",
-            narrative=description,
-            severity=severity
-        )
-        return f"✅ Fatigue logged successfully (Episode ID: {episode_id})."
-    
-    # Return current fatigue episodes
-    fatigue_episodes = store.current_episodes(topic="fatigue")
-    if not fatigue_episodes:
-        return "No current fatigue episodes recorded."
-    
-    return f"Current fatigue: {json.dumps(fatigue_episodes, default=str, indent=2)}"
+        return _log_episode("fatigue", "Fatigue", description, severity)
+    return _list_episodes(
+        get_store().current_episodes(topic="fatigue"),
+        "Current fatigue",
+        "No current fatigue episodes recorded.",
+    )
 
 
 @tool("effort")
@@ -314,22 +646,13 @@ def effort_tool(
     - description: details about effort level, how training felt
     - severity: 1-10 scale (10 = maximum effort)
     """
-    store = get_store()
-    
     if description:
-        episode_id = store.log_episode(
-            topic="effort",
-            narrative=description,
-            severity=severity
-        )
-        return f"✅ Effort logged successfully (Episode ID: {episode_id})."
-    
-    # Return recent effort logs
-    recent_efforts = store.get_recent_episodes(days=7, topic="effort")
-    if not recent_efforts:
-        return "No recent effort logs found."
-    
-    return f"Recent effort logs: {json.dumps(recent_efforts, default=str, indent=2)}"
+        return _log_episode("effort", "Effort", description, severity)
+    return _list_episodes(
+        get_store().get_recent_episodes(days=7, topic="effort"),
+        "Recent effort logs",
+        "No recent effort logs found.",
+    )
 
 
 @tool("episode_history")
@@ -349,7 +672,19 @@ def episode_history_tool(
         filter_text = f" for topic '{topic}'" if topic else ""
         return f"No episodes found in the last {days} days{filter_text}."
     
-    return f"Recent episodes (last {days} days): {json.dumps(episodes, default=str, indent=2)}"
+    return f"Recent episodes (last {days} days): {_dumps(episodes)}"
+
+
+@tool("athlete_snapshot")
+def athlete_snapshot_tool() -> str:
+    """
+    Get everything known about the athlete in one call: profile, active goals,
+    current injuries and fatigue, recent effort logs and recent conversations.
+    Call this once at the start of a conversation instead of the individual tools.
+    """
+    store = get_store()
+    snapshot = store.get_snapshot()
+    return f"Athlete snapshot: {_dumps(snapshot)}"
 
 
 @tool("conversation_context")
@@ -360,71 +695,110 @@ def conversation_context_tool() -> str:
     """
     store = get_store()
     context = store.get_context_summary()
-    return f"Stored context: {json.dumps(context, default=str, indent=2)}"
+    return f"Stored context: {_dumps(context)}"
+
+
+_DATASTORE_TOOLS: List[BaseTool] = [
+    athlete_snapshot_tool,
+    profile_tool,
+    goals_tool,
+    injury_tool,
+    fatigue_tool,
+    effort_tool,
+    episode_history_tool,
+    conversation_context_tool,
+]
+
+_ALL_TOOLS: List[BaseTool] = _STRAVA_TOOLS + _DATASTORE_TOOLS
 
 
 def get_datastore_tools() -> List:
     """Get all data store tools."""
-    return [
-        profile_tool,
-        goals_tool, 
-        injury_tool,
-        fatigue_tool,
-        effort_tool,
-        episode_history_tool,
-        conversation_context_tool,
-    ]
+    return _DATASTORE_TOOLS
 
 
 def get_all_tools() -> List:
     """Get all tools (Strava + Data Store)."""
-    return get_strava_tools() + get_datastore_tools()
+    return _ALL_TOOLS
 
 
 def initialize_llm() -> ChatOpenAI:
     """Initialize the OpenAI LLM client."""
+    _load_env()
     api_key = os.getenv("OPENAI_API_KEY")
-    model = os.getenv("OPENAI_MODEL", "gpt-4o")
+    # The smaller model keeps the many tool-routing iterations fast and cheap;
+    # set OPENAI_MODEL (e.g. gpt-4o) for heavier reasoning
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable is required")
     
-    # o3 models don't support custom temperature settings
+    # o-series models spend hidden reasoning tokens out of the same output
+    # budget and can think for a while before the first streamed token
+    reasoning_model = model.startswith("o")
+    max_tokens = os.getenv("OPENAI_MAX_TOKENS")
+    if max_tokens is None and not reasoning_model:
+        max_tokens = "800"  # Coaching replies rarely need more
+    
+    # o-series models don't support custom temperature settings
     llm_kwargs = {
         "api_key": api_key,
         "model": model,
+        "streaming": True,
+        "max_retries": 2,
+        "timeout": 120 if reasoning_model else 30,
+        # Let the model request several independent tools in one step;
+        # AgentExecutor.ainvoke then runs them concurrently
+        "model_kwargs": {"parallel_tool_calls": True},
     }
     
+    # Bound each generation where a cap applies
+    if max_tokens is not None:
+        llm_kwargs["max_tokens"] = int(max_tokens)
+    
     # Only add temperature for models that support it
-    if not model.startswith("o3"):
+    if not reasoning_model:
         llm_kwargs["temperature"] = 0.1  # Low temperature for more consistent responses
     
     return ChatOpenAI(**llm_kwargs)
 
 
+def _handle_parsing_error(error: Exception) -> str:
+    """Send a short correction back to the LLM instead of echoing the bad output."""
+    return "Invalid tool call or response format. Reply with a valid tool call or a final answer."
+
+
+@functools.lru_cache(maxsize=1)
+def _get_llm() -> ChatOpenAI:
+    """Get the shared LLM client, created on first use."""
+    return initialize_llm()
+
+
+def _current_location() -> Optional[str]:
+    """Get the athlete's current location from the profile for prompt context."""
+    profile = get_store().get_profile()
+    if not profile:
+        return None
+    return profile.get('current_location') or profile.get('default_location')
+
+
 def create_ultra_trainer_agent() -> AgentExecutor:
     """Create and return the configured ultra trainer agent."""
+    _load_env()
+    
     # Initialize components
-    llm = initialize_llm()
+    llm = _get_llm()
     tools = get_all_tools()  # Use all tools (Strava + Data Store)
     
-    # Get current location from athlete profile for context
-    store = get_store()
-    profile = store.get_profile()
-    current_location = None
-    if profile:
-        current_location = profile.get('current_location') or profile.get('default_location')
-    
-    # Create agent prompt with location context
-    prompt = create_agent_prompt(current_location=current_location)  
+    # The agent is shared for the life of the process, so the location is
+    # read from the (cached) profile each time the prompt is formatted
+    prompt = create_agent_prompt(current_location=_current_location)
     
     # Ensure Strava client is initialized
     if server.strava_client is None:
-        refresh_token = os.getenv("STRAVA_REFRESH_TOKEN")
-        client_id = os.getenv("STRAVA_CLIENT_ID")
-        client_secret = os.getenv("STRAVA_CLIENT_SECRET")
+        refresh_token, client_id, client_secret = _strava_credentials()
         
-        if not all([refresh_token, client_id, client_secret]):
+        if not (refresh_token and client_id and client_secret):
             raise ValueError(
                 "Strava credentials not configured. Please set STRAVA_REFRESH_TOKEN, "
                 "STRAVA_CLIENT_ID, and STRAVA_CLIENT_SECRET environment variables."
@@ -433,6 +807,7 @@ def create_ultra_trainer_agent() -> AgentExecutor:
         server.strava_client = server.StravaClient(
             refresh_token, client_id, client_secret
         )
+        server.strava_client.start_background_refresh()
     
     # Create the agent
     agent = create_openai_tools_agent(llm, tools, prompt)
@@ -441,9 +816,13 @@ def create_ultra_trainer_agent() -> AgentExecutor:
     return AgentExecutor(
         agent=agent,
         tools=tools,
-        verbose=True,
-        handle_parsing_errors=True,
-        max_iterations=15,  # Increased for more complex multi-tool workflows
+        verbose=os.getenv("ULTRA_TRAINER_DEBUG") == "1",
+        handle_parsing_errors=_handle_parsing_error,
+        # The tool graph is shallow (snapshot/list -> details -> answer) and
+        # independent calls share one step, so a few iterations are enough
+        max_iterations=int(os.getenv("ULTRA_TRAINER_MAX_ITERATIONS", "5")),
+        # Tools agents only support "force": return a fixed message at the cap
+        early_stopping_method="force",
     )
 
 
@@ -451,15 +830,3 @@ def get_agent() -> AgentExecutor:
     """Get a configured ultra trainer agent instance."""
     return create_ultra_trainer_agent()
 
-
-if __name__ == "__main__":
-    # Example usage
-    agent = get_agent()
-    
-    # Test the agent
-    response = agent.invoke({
-        "input": "Show me my recent running activities and provide a brief analysis of my training."
-    })
-    
-    print("Agent Response:")
-    print(response["output"])
@@ -3,62 +3,181 @@
 Streamlit Web Interface for Ultra Trainer
 
 This module provides a web-based chat interface for the ultra marathon training agent.
-It provides a simple multi-turn conversation interface without persistent storage
-or special commands for now.
+It provides a simple multi-turn conversation interface without special commands
+for now. Every turn is saved to the context store's conversation history under
+the chat session's id (kept in the page URL), so reloading the page resumes that
+session's recent turns.
 """
 
+import asyncio
+import atexit
+import functools
 import os
+import queue
+import threading
+import uuid
+from collections import deque
+from itertools import groupby
 import streamlit as st
 from dotenv import load_dotenv
 
-from ultra_trainer.agent import get_agent
 
-# Load environment variables
-load_dotenv()
+# Number of previous messages (3 exchanges) passed to the agent as chat history
+CHAT_HISTORY_MESSAGES = 6
+# Longer history messages are truncated once, when they enter the history
+HISTORY_MESSAGE_CHARS = 1000
 
+GREETING = {
+    "role": "assistant",
+    "content": "Hi! I'm your ultra marathon training coach. I can analyze your Strava data and provide personalized advice. Tell me about your training goals and current situation!"
+}
 
-def build_conversation_context(messages, current_prompt):
-    """
-    Build conversation context by including recent message history.
+
+def _history_message(speaker, text):
+    """Build a (truncated) history message for the agent prompt."""
+    # Imported here so the page renders before LangChain loads
+    from langchain_core.messages import AIMessage, HumanMessage
+    if len(text) > HISTORY_MESSAGE_CHARS:
+        text = text[:HISTORY_MESSAGE_CHARS] + "..."
+    return HumanMessage(text) if speaker == "user" else AIMessage(text)
+
+
+@functools.lru_cache(maxsize=1)
+def _token_handler_class():
+    """Define the token handler on first use, so LangChain loads with the agent."""
+    from langchain_core.callbacks import BaseCallbackHandler
     
-    Args:
-        messages: List of conversation messages
-        current_prompt: Current user input
+    class StreamlitTokenHandler(BaseCallbackHandler):
+        """Queue LLM tokens for the script thread to render as they arrive."""
         
-    Returns:
-        Enhanced prompt with conversation context
-    """
-    # Get the last few exchanges (excluding the current prompt we just added)
-    recent_messages = messages[:-1]  # Exclude the current user message
-    
-    # Limit to last 6 messages (3 exchanges) to keep context manageable
-    if len(recent_messages) > 6:
-        recent_messages = recent_messages[-6:]
-    
-    context_parts = []
-    
-    # Add recent conversation history
-    if len(recent_messages) > 1:  # Only add if there's actual conversation history
-        context_parts.append("Recent conversation context:")
+        # Call back on the agent's event loop thread instead of an executor;
+        # the handler only queues events, so it never blocks the loop
+        run_inline = True
+        
+        def __init__(self):
+            self.events = queue.Queue()
         
-        for i, msg in enumerate(recent_messages[1:], 1):  # Skip initial greeting
-            role = "User" if msg["role"] == "user" else "Coach"
-            # Truncate long messages for context
-            content = msg["content"][:1000] + "..." if len(msg["content"]) > 1000 else msg["content"]
-            context_parts.append(f"{role}: {content}")
+        def on_llm_start(self, *args, **kwargs):
+            # Each agent iteration is a new LLM call; only the last one is the answer
+            self.events.put(None)
         
-        context_parts.append("")  # Empty line separator
+        def on_llm_new_token(self, token: str, **kwargs):
+            # Tool-call chunks arrive with empty content
+            if token:
+                self.events.put(token)
+    
+    return StreamlitTokenHandler
+
+
+@st.cache_resource(show_spinner=False)
+def _event_loop():
+    """
+    Run one event loop per process in a background thread, so the agent's
+    async HTTP clients and their keep-alive connections outlive each turn.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="agent-loop", daemon=True).start()
+    return loop
+
+
+def run_agent(agent, inputs, placeholder):
+    """
+    Run the agent on the shared event loop, streaming its tokens into the
+    placeholder from the script thread, which owns the Streamlit elements.
+    """
+    handler = _token_handler_class()()
+    future = asyncio.run_coroutine_threadsafe(
+        agent.ainvoke(inputs, config={"callbacks": [handler]}), _event_loop()
+    )
+    text = ""
+    while True:
+        try:
+            token = handler.events.get(timeout=0.05)
+        except queue.Empty:
+            if future.done():
+                break
+            continue
+        text = "" if token is None else text + token
+        if text:
+            placeholder.markdown(text + "▌")
+    return future.result()
+
+
+@st.cache_resource(show_spinner=False)
+def _cached_agent():
+    """Build the agent once per process and share it across sessions and reruns."""
+    # Imported here so the page renders before LangChain and OpenAI load
+    from ultra_trainer.agent import get_agent
+    return get_agent()
+
+
+def chat_session_id():
+    """Get this chat's session id, resuming the one in the page URL if present."""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = st.query_params.get("sid") or uuid.uuid4().hex
+        st.query_params["sid"] = st.session_state.session_id
+    return st.session_state.session_id
+
+
+def _answered_turns(turns):
+    """Drop user turns that never got a reply (e.g. the agent run failed)."""
+    return [
+        turn
+        for turn, following in zip(turns, turns[1:] + [None])
+        if turn["speaker"] != "user" or (following is not None and following["speaker"] != "user")
+    ]
+
+
+def load_chat_history(session_id):
+    """Get the most recent answered turns stored for a chat session."""
+    from ultra_trainer.agent import get_store
+    # Read extra turns so dropped unanswered ones don't shrink the window
+    turns = get_store().last_n_turns(CHAT_HISTORY_MESSAGES * 2, session_id=session_id)
+    return _answered_turns(turns)[-CHAT_HISTORY_MESSAGES:]
+
+
+@st.cache_resource(show_spinner=False)
+def _chat_writer():
+    """Start one background thread per process that persists chat turns."""
+    from ultra_trainer.agent import get_store
+    store = get_store()
+    writes = queue.Queue()
     
-    # Add current question
-    context_parts.append(f"Current question: {current_prompt}")
+    def drain():
+        while True:
+            # Commit whatever has queued up since the last write in one go
+            batch = [writes.get()]
+            while True:
+                try:
+                    batch.append(writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with store.transaction() as tx:
+                    for session_id, turns in groupby(batch, key=lambda write: write[0]):
+                        tx.add_convo_turns([(speaker, text) for _, speaker, text in turns], session_id)
+            except Exception as e:
+                # A lost history row must not stop later writes
+                print(f"Failed to save {len(batch)} chat turn(s): {e}")
+            finally:
+                for _ in batch:
+                    writes.task_done()
     
-    return "\n".join(context_parts)
+    threading.Thread(target=drain, name="chat-writer", daemon=True).start()
+    # Flush pending turns before the interpreter exits
+    atexit.register(writes.join)
+    return writes
+
+
+def save_chat_message(session_id, speaker, text):
+    """Queue a message for the conversation history table."""
+    _chat_writer().put((session_id, speaker, text))
 
 
 def initialize_agent():
     """Initialize the training agent."""
     try:
-        return get_agent()
+        return _cached_agent()
     except Exception as e:
         st.error(f"Failed to initialize agent: {e}")
         st.error("Please check your environment variables and configuration.")
@@ -67,6 +186,9 @@ def initialize_agent():
 
 def main():
     """Main Streamlit app."""
+    # Load environment variables
+    load_dotenv()
+    
     st.set_page_config(
         page_title="Ultra Trainer - AI Running Coach",
         page_icon="🏃‍♂️",
@@ -94,13 +216,18 @@ def main():
             if st.session_state.agent is None:
                 st.stop()
     
-    # Initialize chat history
-    if "messages" not in st.session_state:
-        st.session_state.messages = [
-            {
-                "role": "assistant",
-                "content": "Hi! I'm your ultra marathon training coach. I can analyze your Strava data and provide personalized advice. Tell me about your training goals and current situation!"
-            }
+    # Structured history for the agent prompt (excludes the greeting); only
+    # the last few stored turns of this chat session are loaded, and they are
+    # shown below the greeting so the agent's context is visible
+    if "chat_history" not in st.session_state:
+        turns = load_chat_history(chat_session_id())
+        st.session_state.chat_history = deque(
+            (_history_message(turn["speaker"], turn["text"]) for turn in turns),
+            maxlen=CHAT_HISTORY_MESSAGES,
+        )
+        st.session_state.messages = [dict(GREETING)] + [
+            {"role": "user" if turn["speaker"] == "user" else "assistant", "content": turn["text"]}
+            for turn in turns
         ]
     
     # Display chat messages
@@ -112,6 +239,8 @@ def main():
     if prompt := st.chat_input("Ask your coach anything..."):
         # Add user message to chat history
         st.session_state.messages.append({"role": "user", "content": prompt})
+        # The user turn is known already; store it while the agent runs
+        save_chat_message(chat_session_id(), "user", prompt)
         
         # Display user message
         with st.chat_message("user"):
@@ -119,17 +248,27 @@ def main():
         
         # Get agent response
         with st.chat_message("assistant"):
+            placeholder = st.empty()
             with st.spinner("Coach is thinking..."):
                 try:
-                    # Build conversation context for the agent
-                    enhanced_prompt = build_conversation_context(st.session_state.messages, prompt)
-                    
-                    response = st.session_state.agent.invoke({"input": enhanced_prompt})
+                    # Stream tokens into the placeholder while the agent runs;
+                    # the async path executes parallel tool calls concurrently
+                    response = run_agent(
+                        st.session_state.agent,
+                        {
+                            "input": prompt,
+                            "chat_history": list(st.session_state.chat_history),
+                        },
+                        placeholder,
+                    )
                     agent_output = response.get("output", "I'm sorry, I couldn't process that request.")
-                    st.write(agent_output)
+                    placeholder.markdown(agent_output)
                     
                     # Add assistant response to chat history
                     st.session_state.messages.append({"role": "assistant", "content": agent_output})
+                    st.session_state.chat_history.append(_history_message("user", prompt))
+                    st.session_state.chat_history.append(_history_message("agent", agent_output))
+                    save_chat_message(chat_session_id(), "agent", agent_output)
                     
                 except Exception as e:
                     error_msg = f"I encountered an error: {e}. Please try again or check your configuration."
@@ -148,12 +287,11 @@ def main():
         st.write("• Helps with race preparation")
         
         if st.button("Clear Chat"):
-            st.session_state.messages = [
-                {
-                    "role": "assistant",
-                    "content": "Hi! I'm your ultra marathon training coach. I can analyze your Strava data and provide personalized advice. Tell me about your training goals and current situation!"
-                }
-            ]
+            st.session_state.chat_history.clear()
+            st.session_state.messages = [dict(GREETING)]
+            # Start a new chat session so a reload doesn't bring the turns back
+            st.session_state.session_id = uuid.uuid4().hex
+            st.query_params["sid"] = st.session_state.session_id
             st.rerun()
 
 
@@ -7,14 +7,22 @@ goals, episodes (injury/fatigue logs), and conversation history.
 """
 
 import os
-from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
 from pathlib import Path
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Enum, Float
+from sqlalchemy import (
+    create_engine, delete, event, insert, select, text, Column, Integer, SmallInteger, String, Text, DateTime, Enum,
+    Float, Index, TypeDecorator
+)
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import Row, make_url
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.sql import func
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql import Select, func
 import enum
 
 Base = declarative_base()
@@ -33,6 +41,51 @@ class EpisodeTopic(enum.Enum):
     OTHER = "other"
 
 
+# Topic strings from callers resolve with one dict lookup instead of the
+# enum constructor's ValueError on unknown topics
+_TOPIC_BY_VALUE = {topic.value: topic for topic in EpisodeTopic}
+
+
+class Speaker(enum.IntEnum):
+    """Who said a conversation turn, stored as a small integer."""
+    USER = 0
+    AGENT = 1
+
+
+_SPEAKER_BY_NAME = {"user": Speaker.USER, "agent": Speaker.AGENT}
+_NAME_BY_SPEAKER = {code: name for name, code in _SPEAKER_BY_NAME.items()}
+
+
+def _speaker_code(name: str) -> Speaker:
+    """Map a speaker string from callers to its stored code."""
+    try:
+        return _SPEAKER_BY_NAME[name]
+    except KeyError:
+        raise ValueError(f"Unknown speaker: {name!r}") from None
+
+
+class _SpeakerType(TypeDecorator):
+    """
+    Store Speaker codes as 0/1 and read them back as 'user'/'agent' strings.
+    Databases created with the old VARCHAR column keep their string rows
+    (which could hold any speaker name), and SQLite's text affinity there
+    turns new codes into '0'/'1', so reads map codes back and pass any other
+    legacy string through unchanged.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(value)
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, int):
+            return _NAME_BY_SPEAKER.get(value, str(value))
+        if value in ("0", "1"):
+            return _NAME_BY_SPEAKER[int(value)]
+        return value
+
+
 class AthleteProfile(Base):
     """One-row source of truth for stable athlete attributes."""
     __tablename__ = 'athlete_profile'
@@ -59,7 +112,7 @@ class Goal(Base):
     goal_id = Column(Integer, primary_key=True, autoincrement=True)
     event_name = Column(String(255), nullable=False)
     distance_km = Column(Float)
-    event_datetime = Column(DateTime(timezone=True))
+    event_datetime = Column(DateTime(timezone=True), index=True)
     context_text = Column(Text)
     target_time_seconds = Column(Integer)
     created_at = Column(DateTime(timezone=True), default=func.now())
@@ -69,12 +122,16 @@ class Goal(Base):
 class Episode(Base):
     """Episodic states the runner logs (injury, fatigue, etc.)."""
     __tablename__ = 'episodes'
+    __table_args__ = (
+        # Ongoing episodes by topic, already newest-first (current_episodes)
+        Index("ix_episodes_open_by_topic", "topic", "end_date", "start_date"),
+    )
     
     episode_id = Column(Integer, primary_key=True, autoincrement=True)
     topic = Column(Enum(EpisodeTopic), nullable=False)
     severity = Column(Integer)  # 1-10 scale where applicable
     narrative_text = Column(Text, nullable=False)
-    start_date = Column(DateTime(timezone=True), default=func.now())
+    start_date = Column(DateTime(timezone=True), default=func.now(), index=True)
     end_date = Column(DateTime(timezone=True))  # NULL for ongoing episodes
     created_at = Column(DateTime(timezone=True), default=func.now())
 
@@ -82,16 +139,96 @@ class Episode(Base):
 class ConvoHistory(Base):
     """Raw chat history for conversation context."""
     __tablename__ = 'convo_history'
+    __table_args__ = (
+        # One chat session's newest turns (last_n_turns with a session_id)
+        Index("ix_convo_history_session", "session_id", "timestamp"),
+    )
     
     turn_id = Column(Integer, primary_key=True, autoincrement=True)
-    speaker = Column(String(50), nullable=False)  # 'user' or 'agent'
+    speaker = Column(_SpeakerType, nullable=False)  # 'user' or 'agent'
     text = Column(Text, nullable=False)
-    timestamp = Column(DateTime(timezone=True), default=func.now())
+    # Chat session the turn belongs to; NULL for turns stored without one
+    session_id = Column(String(64))
+    # SQLite walks this index backwards for the newest-first reads
+    timestamp = Column(DateTime(timezone=True), default=func.now(), index=True)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune each new file-backed SQLite connection for many small commits:
+    WAL lets readers run alongside the writer, and synchronous=NORMAL
+    skips the per-commit fsync of the WAL (still safe against app crashes).
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-64000")
+        # Wait for another process's write lock instead of failing at once
+        cursor.execute("PRAGMA busy_timeout=5000")
+    finally:
+        cursor.close()
+
+
+def _iso_text(column):
+    """
+    Select a DateTime column as its ISO 8601 text, matching datetime.isoformat().
+    SQLite stores these as 'YYYY-MM-DD HH:MM:SS[.ffffff]' strings, so the
+    conversion happens in SQL instead of parsing to datetime and back.
+    NULL stays NULL.
+    """
+    return func.replace(
+        func.replace(column, " ", "T"), ".000000", "", type_=String
+    ).label(column.key)
+
+
+# Column lists for the read paths; selecting plain rows skips ORM object
+# hydration and identity-map bookkeeping for results that become dicts
+_PROFILE_COLUMNS = (
+    AthleteProfile.athlete_id,
+    AthleteProfile.birth_year,
+    AthleteProfile.gender,
+    AthleteProfile.history_text,
+    AthleteProfile.weight_kg,
+    AthleteProfile.running_years,
+    AthleteProfile.preferred_terrain,
+    AthleteProfile.weekly_mileage_km,
+    AthleteProfile.ultra_experience,
+    AthleteProfile.current_location,
+    AthleteProfile.default_location,
+    _iso_text(AthleteProfile.updated_at),
+)
+
+_GOAL_COLUMNS = (
+    Goal.goal_id,
+    Goal.event_name,
+    Goal.distance_km,
+    _iso_text(Goal.event_datetime),
+    Goal.context_text,
+    Goal.target_time_seconds,
+    _iso_text(Goal.created_at),
+    _iso_text(Goal.updated_at),
+)
+
+_EPISODE_COLUMNS = (
+    Episode.episode_id,
+    Episode.topic,
+    Episode.severity,
+    Episode.narrative_text,
+    _iso_text(Episode.start_date),
+    _iso_text(Episode.end_date),
+    _iso_text(Episode.created_at),
+)
 
 
 class ContextStore:
     """Data access layer for Ultra Trainer persistent memory."""
     
+    PROFILE_CACHE_TTL_SECONDS = 5.0
+    SUMMARY_CACHE_TTL_SECONDS = 60.0
+    
     def __init__(self, db_url: str = "sqlite:///ultra_trainer.db"):
         """Initialize the context store with database connection."""
         # Ensure the database directory exists
@@ -99,9 +236,46 @@ class ContextStore:
             db_path = Path(db_url.replace("sqlite:///", ""))
             db_path.parent.mkdir(parents=True, exist_ok=True)
         
-        self.engine = create_engine(db_url, echo=False)
+        url = make_url(db_url)
+        file_backed_sqlite = url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+        
+        if file_backed_sqlite:
+            # Keep a pool of open connections so sessions don't reopen the file
+            # (and its -wal/-shm files) each call; connections are shared with
+            # background threads such as the app's chat writer
+            self.engine = create_engine(
+                db_url,
+                echo=False,
+                poolclass=QueuePool,
+                pool_size=5,
+                max_overflow=10,
+                connect_args={"check_same_thread": False},
+            )
+            # SQLite allows one writer at a time; writes go through a single
+            # connection held under _write_lock so threads queue here instead
+            # of failing with SQLITE_BUSY, while WAL readers use the pool
+            self.write_engine = create_engine(
+                db_url,
+                echo=False,
+                poolclass=QueuePool,
+                pool_size=1,
+                max_overflow=0,
+                connect_args={"check_same_thread": False},
+            )
+            event.listen(self.engine, "connect", _set_sqlite_pragmas)
+            event.listen(self.write_engine, "connect", _set_sqlite_pragmas)
+        else:
+            # Separate engines would see separate in-memory databases
+            self.engine = create_engine(db_url, echo=False)
+            self.write_engine = self.engine
+        
         Base.metadata.create_all(self.engine)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.write_engine)
+        self._write_lock = threading.Lock()
+        self._write_version = 0
+        self._read_cache: Dict[str, Tuple[int, float, Dict[str, Any]]] = {}
+        self._profile_cache: Optional[Tuple[int, float, Optional[Dict[str, Any]]]] = None
         
         # Handle database migrations
         self._migrate_database()
@@ -110,27 +284,65 @@ class ContextStore:
         """Handle database schema migrations."""
         # Use raw SQL to check and add columns if they don't exist
         try:
-            with self.engine.connect() as conn:
+            with self.engine.begin() as conn:
                 # Check if location columns exist by trying to query them
                 try:
-                    conn.execute("SELECT current_location FROM athlete_profile LIMIT 1")
+                    conn.execute(text("SELECT current_location FROM athlete_profile LIMIT 1"))
+                except Exception:
+                    # Column doesn't exist, add it
+                    conn.execute(text("ALTER TABLE athlete_profile ADD COLUMN current_location VARCHAR(255)"))
+                
+                try:
+                    conn.execute(text("SELECT default_location FROM athlete_profile LIMIT 1"))
                 except Exception:
                     # Column doesn't exist, add it
-                    conn.execute("ALTER TABLE athlete_profile ADD COLUMN current_location VARCHAR(255)")
+                    conn.execute(text("ALTER TABLE athlete_profile ADD COLUMN default_location VARCHAR(255)"))
                 
                 try:
-                    conn.execute("SELECT default_location FROM athlete_profile LIMIT 1")
+                    conn.execute(text("SELECT session_id FROM convo_history LIMIT 1"))
                 except Exception:
                     # Column doesn't exist, add it
-                    conn.execute("ALTER TABLE athlete_profile ADD COLUMN default_location VARCHAR(255)")
+                    conn.execute(text("ALTER TABLE convo_history ADD COLUMN session_id VARCHAR(64)"))
         except Exception:
             # If there's any error (like table doesn't exist yet), ignore
             pass
+        
+        # create_all skips existing tables along with their indexes, so add
+        # indexes introduced after a database was first created
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
     
     def _get_session(self) -> Session:
         """Get a database session."""
         return self.SessionLocal()
     
+    @contextmanager
+    def _write_session(self) -> Iterator[Session]:
+        """Get a session on the writer connection, held exclusively by this thread."""
+        with self._write_lock:
+            try:
+                with self.WriteSessionLocal() as session:
+                    yield session
+            finally:
+                # Invalidates cached read results
+                self._write_version += 1
+    
+    @contextmanager
+    def transaction(self) -> Iterator["StoreTransaction"]:
+        """
+        Group several writes into one commit:
+
+            with store.transaction() as tx:
+                tx.add_convo_turn("user", text)
+                tx.log_episode("fatigue", text, severity=6)
+
+        Everything is rolled back if the block raises.
+        """
+        with self._write_session() as session, session.begin():
+            yield StoreTransaction(self, session)
+    
     # ------ Profile Methods ------
     
     def upsert_profile(
@@ -148,7 +360,7 @@ class ContextStore:
         default_location: Optional[str] = None
     ) -> None:
         """Create or update athlete profile."""
-        with self._get_session() as session:
+        with self._write_session() as session:
             profile = session.query(AthleteProfile).first()
             
             if profile is None:
@@ -181,26 +393,45 @@ class ContextStore:
             session.commit()
     
     def get_profile(self) -> Optional[Dict[str, Any]]:
-        """Get current athlete profile."""
-        with self._get_session() as session:
-            profile = session.query(AthleteProfile).first()
-            if profile is None:
-                return None
-            
-            return {
-                "athlete_id": profile.athlete_id,
-                "birth_year": profile.birth_year,
-                "gender": profile.gender,
-                "history_text": profile.history_text,
-                "weight_kg": profile.weight_kg,
-                "running_years": profile.running_years,
-                "preferred_terrain": profile.preferred_terrain,
-                "weekly_mileage_km": profile.weekly_mileage_km,
-                "ultra_experience": profile.ultra_experience,
-                "current_location": profile.current_location,
-                "default_location": profile.default_location,
-                "updated_at": profile.updated_at.isoformat() if profile.updated_at else None
-            }
+        """
+        Get current athlete profile.
+        The single row rarely changes, so it is cached for
+        PROFILE_CACHE_TTL_SECONDS or until the next write.
+        """
+        now = time.monotonic()
+        cached = self._profile_cache
+        if cached is not None and cached[0] == self._write_version and cached[1] > now:
+            profile = cached[2]
+        else:
+            # Read the version first, as in _cached_read: an upsert committing
+            # mid-read bumps it, so the old row is never served as fresh
+            version = self._write_version
+            with self._get_session() as session:
+                profile = self._get_profile(session)
+            self._profile_cache = (version, now + self.PROFILE_CACHE_TTL_SECONDS, profile)
+        # Copy so callers can't mutate the cached row
+        return dict(profile) if profile is not None else None
+    
+    def _get_profile(self, session: Session) -> Optional[Dict[str, Any]]:
+        """Get current athlete profile using an open session."""
+        profile = session.execute(select(*_PROFILE_COLUMNS).limit(1)).first()
+        if profile is None:
+            return None
+        
+        return {
+            "athlete_id": profile.athlete_id,
+            "birth_year": profile.birth_year,
+            "gender": profile.gender,
+            "history_text": profile.history_text,
+            "weight_kg": profile.weight_kg,
+            "running_years": profile.running_years,
+            "preferred_terrain": profile.preferred_terrain,
+            "weekly_mileage_km": profile.weekly_mileage_km,
+            "ultra_experience": profile.ultra_experience,
+            "current_location": profile.current_location,
+            "default_location": profile.default_location,
+            "updated_at": profile.updated_at
+        }
     
     # ------ Goal Methods ------
     
@@ -214,10 +445,10 @@ class ContextStore:
         target_time_seconds: Optional[int] = None
     ) -> int:
         """Add new goal or update existing goal. Returns goal_id."""
-        with self._get_session() as session:
+        with self._write_session() as session:
             if goal_id:
                 # Update existing goal
-                goal = session.query(Goal).filter(Goal.goal_id == goal_id).first()
+                goal = session.get(Goal, goal_id)
                 if goal is None:
                     raise ValueError(f"Goal with ID {goal_id} not found")
             else:
@@ -237,44 +468,51 @@ class ContextStore:
             if target_time_seconds is not None:
                 goal.target_time_seconds = target_time_seconds
             
+            # The INSERT's RETURNING populates the key on flush; read it
+            # before commit expires the instance to avoid a re-SELECT
+            session.flush()
+            goal_id = goal.goal_id
             session.commit()
-            session.refresh(goal)
-            return goal.goal_id
+            return goal_id
     
     def get_active_goals(self) -> List[Dict[str, Any]]:
         """Get all active goals (future events)."""
         with self._get_session() as session:
-            now = datetime.now(timezone.utc)
-            goals = session.query(Goal).filter(
+            return self._get_active_goals(session)
+    
+    def _get_active_goals(self, session: Session) -> List[Dict[str, Any]]:
+        """Get all active goals using an open session."""
+        now = datetime.now(timezone.utc)
+        goals = session.execute(
+            select(*_GOAL_COLUMNS).where(
                 (Goal.event_datetime.is_(None)) | (Goal.event_datetime > now)
-            ).order_by(Goal.event_datetime.asc()).all()
-            
-            return [
-                {
-                    "goal_id": goal.goal_id,
-                    "event_name": goal.event_name,
-                    "distance_km": goal.distance_km,
-                    "event_datetime": goal.event_datetime.isoformat() if goal.event_datetime else None,
-                    "context_text": goal.context_text,
-                    "target_time_seconds": goal.target_time_seconds,
-                    "created_at": goal.created_at.isoformat() if goal.created_at else None,
-                    "updated_at": goal.updated_at.isoformat() if goal.updated_at else None
-                }
-                for goal in goals
-            ]
+            ).order_by(Goal.event_datetime.asc())
+        ).all()
+        
+        return [
+            {
+                "goal_id": goal.goal_id,
+                "event_name": goal.event_name,
+                "distance_km": goal.distance_km,
+                "event_datetime": goal.event_datetime,
+                "context_text": goal.context_text,
+                "target_time_seconds": goal.target_time_seconds,
+                "created_at": goal.created_at,
+                "updated_at": goal.updated_at
+            }
+            for goal in goals
+        ]
     
     def remove_goal(self, goal_id: Optional[int] = None, event_name: Optional[str] = None) -> bool:
         """
         Remove a goal by ID or event name.
         Returns True if a goal was removed, False otherwise.
         """
-        with self._get_session() as session:
-            query = session.query(Goal)
-            
+        with self._write_session() as session:
             if goal_id is not None:
-                goal = query.filter(Goal.goal_id == goal_id).first()
+                goal = session.get(Goal, goal_id)
             elif event_name is not None:
-                goal = query.filter(Goal.event_name == event_name).first()
+                goal = session.query(Goal).filter(Goal.event_name == event_name).first()
             else:
                 return False
             
@@ -295,58 +533,61 @@ class ContextStore:
         end_date: Optional[datetime] = None
     ) -> int:
         """Log a new episode (injury, fatigue, etc.). Returns episode_id."""
-        with self._get_session() as session:
-            # Convert string topic to enum
-            try:
-                topic_enum = EpisodeTopic(topic.lower())
-            except ValueError:
-                topic_enum = EpisodeTopic.OTHER
-            
-            episode = Episode(
-                topic=topic_enum,
-                narrative_text=narrative,
-                severity=severity,
-                start_date=start_date or datetime.now(timezone.utc),
-                end_date=end_date
-            )
-            
-            session.add(episode)
+        with self._write_session() as session:
+            episode_id = self._log_episode(session, topic, narrative, severity, start_date, end_date)
             session.commit()
-            session.refresh(episode)
-            return episode.episode_id
+            return episode_id
+    
+    def _log_episode(
+        self,
+        session: Session,
+        topic: str,
+        narrative: str,
+        severity: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> int:
+        """Log a new episode using an open session, without committing."""
+        # Convert string topic to enum
+        topic_enum = _TOPIC_BY_VALUE.get(topic.lower(), EpisodeTopic.OTHER)
+        
+        episode = Episode(
+            topic=topic_enum,
+            narrative_text=narrative,
+            severity=severity,
+            start_date=start_date or datetime.now(timezone.utc),
+            end_date=end_date
+        )
+        
+        session.add(episode)
+        # The INSERT's RETURNING populates the key on flush
+        session.flush()
+        return episode.episode_id
     
     def current_episodes(self, topic: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get current (ongoing) episodes, optionally filtered by topic."""
         with self._get_session() as session:
-            query = session.query(Episode).filter(Episode.end_date.is_(None))
-            
-            if topic:
-                try:
-                    topic_enum = EpisodeTopic(topic.lower())
-                    query = query.filter(Episode.topic == topic_enum)
-                except ValueError:
-                    # If invalid topic, return empty list
-                    return []
-            
-            episodes = query.order_by(Episode.start_date.desc()).all()
-            
-            return [
-                {
-                    "episode_id": episode.episode_id,
-                    "topic": episode.topic.value,
-                    "severity": episode.severity,
-                    "narrative_text": episode.narrative_text,
-                    "start_date": episode.start_date.isoformat() if episode.start_date else None,
-                    "end_date": episode.end_date.isoformat() if episode.end_date else None,
-                    "created_at": episode.created_at.isoformat() if episode.created_at else None
-                }
-                for episode in episodes
-            ]
+            return self._current_episodes(session, topic)
+    
+    def _current_episodes(self, session: Session, topic: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get current (ongoing) episodes using an open session."""
+        query = select(*_EPISODE_COLUMNS).where(Episode.end_date.is_(None))
+        
+        if topic:
+            topic_enum = _TOPIC_BY_VALUE.get(topic.lower())
+            if topic_enum is None:
+                # If invalid topic, return empty list
+                return []
+            query = query.where(Episode.topic == topic_enum)
+        
+        episodes = session.execute(query.order_by(Episode.start_date.desc())).all()
+        
+        return [self._episode_to_dict(episode) for episode in episodes]
     
     def end_episode(self, episode_id: int, end_date: Optional[datetime] = None) -> bool:
         """Mark an episode as ended. Returns True if successful."""
-        with self._get_session() as session:
-            episode = session.query(Episode).filter(Episode.episode_id == episode_id).first()
+        with self._write_session() as session:
+            episode = session.get(Episode, episode_id)
             if episode is None:
                 return False
             
@@ -356,98 +597,241 @@ class ContextStore:
     
     def get_recent_episodes(self, days: int = 30, topic: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get episodes from the last N days."""
+        return list(self.iter_recent_episodes(days, topic))
+    
+    def iter_recent_episodes(self, days: int = 30, topic: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield episodes from the last N days, newest first, fetching rows from
+        SQLite in batches so long windows never sit in memory as raw rows.
+        The session stays open until the iterator is exhausted or closed.
+        """
+        query = self._recent_episodes_query(days, topic)
+        if query is None:
+            return
+        
         with self._get_session() as session:
-            cutoff_date = datetime.now(timezone.utc).replace(
-                hour=0, minute=0, second=0, microsecond=0
-            ) - timedelta(days=days)
-            
-            query = session.query(Episode).filter(Episode.start_date >= cutoff_date)
-            
-            if topic:
-                try:
-                    topic_enum = EpisodeTopic(topic.lower())
-                    query = query.filter(Episode.topic == topic_enum)
-                except ValueError:
-                    return []
-            
-            episodes = query.order_by(Episode.start_date.desc()).all()
-            
-            return [
-                {
-                    "episode_id": episode.episode_id,
-                    "topic": episode.topic.value,
-                    "severity": episode.severity,
-                    "narrative_text": episode.narrative_text,
-                    "start_date": episode.start_date.isoformat() if episode.start_date else None,
-                    "end_date": episode.end_date.isoformat() if episode.end_date else None,
-                    "created_at": episode.created_at.isoformat() if episode.created_at else None
-                }
-                for episode in episodes
-            ]
+            for episode in session.execute(query.execution_options(yield_per=100)):
+                yield self._episode_to_dict(episode)
+    
+    def _get_recent_episodes(
+        self, session: Session, days: int = 30, topic: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get episodes from the last N days using an open session."""
+        query = self._recent_episodes_query(days, topic)
+        if query is None:
+            return []
+        
+        episodes = session.execute(query).all()
+        
+        return [self._episode_to_dict(episode) for episode in episodes]
+    
+    @staticmethod
+    def _recent_episodes_query(days: int, topic: Optional[str]) -> Optional[Select]:
+        """Build the recent-episodes SELECT, or None for an unknown topic."""
+        cutoff_date = datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        ) - timedelta(days=days)
+        
+        query = select(*_EPISODE_COLUMNS).where(Episode.start_date >= cutoff_date)
+        
+        if topic:
+            topic_enum = _TOPIC_BY_VALUE.get(topic.lower())
+            if topic_enum is None:
+                return None
+            query = query.where(Episode.topic == topic_enum)
+        
+        return query.order_by(Episode.start_date.desc())
+    
+    @staticmethod
+    def _episode_to_dict(episode: Row) -> Dict[str, Any]:
+        """Serialize a row of _EPISODE_COLUMNS."""
+        return {
+            "episode_id": episode.episode_id,
+            "topic": episode.topic.value,
+            "severity": episode.severity,
+            "narrative_text": episode.narrative_text,
+            "start_date": episode.start_date,
+            "end_date": episode.end_date,
+            "created_at": episode.created_at
+        }
     
     # ------ Conversation History Methods ------
     
-    def add_convo_turn(self, speaker: str, text: str) -> int:
-        """Add a conversation turn. Returns turn_id."""
-        with self._get_session() as session:
-            turn = ConvoHistory(speaker=speaker, text=text)
-            session.add(turn)
+    def add_convo_turn(self, speaker: str, text: str, session_id: Optional[str] = None) -> int:
+        """Add a conversation turn, optionally tagged with a chat session. Returns turn_id."""
+        return self.add_convo_turns([(speaker, text)], session_id=session_id)[0]
+    
+    def add_convo_turns(self, turns: List[Tuple[str, str]], session_id: Optional[str] = None) -> List[int]:
+        """
+        Add several (speaker, text) conversation turns in one transaction.
+        Returns their turn_ids in the same order.
+        """
+        if not turns:
+            return []
+        
+        with self._write_session() as session:
+            turn_ids = self._add_convo_turns(session, turns, session_id)
             session.commit()
-            session.refresh(turn)
-            return turn.turn_id
+            return turn_ids
     
-    def last_n_turns(self, n: int = 50) -> List[Dict[str, Any]]:
-        """Get the last N conversation turns."""
+    def _add_convo_turns(
+        self, session: Session, turns: List[Tuple[str, str]], session_id: Optional[str] = None
+    ) -> List[int]:
+        """Add conversation turns using an open session, without committing."""
+        # Core executemany-style insert: no ORM objects
+        turn_ids = session.scalars(
+            insert(ConvoHistory).returning(ConvoHistory.turn_id, sort_by_parameter_order=True),
+            [
+                {"speaker": _speaker_code(speaker), "text": text, "session_id": session_id}
+                for speaker, text in turns
+            ],
+        ).all()
+        return list(turn_ids)
+    
+    def log_turn_and_episode(
+        self,
+        *,
+        speaker: str,
+        text: str,
+        topic: Optional[str] = None,
+        narrative: Optional[str] = None,
+        severity: Optional[int] = None
+    ) -> Tuple[int, Optional[int]]:
+        """
+        Record a conversation turn and, if a topic is given, the episode it
+        reported, in one commit. Returns (turn_id, episode_id or None).
+        """
+        with self.transaction() as tx:
+            turn_id = tx.add_convo_turn(speaker, text)
+            episode_id = None
+            if topic:
+                episode_id = tx.log_episode(topic, narrative or text, severity)
+            return turn_id, episode_id
+    
+    def last_n_turns(self, n: int = 50, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the last N conversation turns, across all chat sessions unless one is given."""
         with self._get_session() as session:
-            turns = session.query(ConvoHistory).order_by(
-                ConvoHistory.timestamp.desc()
-            ).limit(n).all()
-            
-            # Reverse to get chronological order
-            turns.reverse()
-            
-            return [
-                {
-                    "turn_id": turn.turn_id,
-                    "speaker": turn.speaker,
-                    "text": turn.text,
-                    "timestamp": turn.timestamp.isoformat() if turn.timestamp else None
-                }
-                for turn in turns
-            ]
+            return self._last_n_turns(session, n, session_id)
+    
+    def _last_n_turns(
+        self, session: Session, n: int = 50, session_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get the last N conversation turns using an open session."""
+        # Timestamps have one-second resolution; turn_id orders turns within a second.
+        # The inner query picks the newest n, the outer one returns them oldest first
+        newest = select(
+            ConvoHistory.turn_id, ConvoHistory.speaker, ConvoHistory.text, ConvoHistory.timestamp
+        )
+        if session_id is not None:
+            newest = newest.where(ConvoHistory.session_id == session_id)
+        newest = newest.order_by(
+            ConvoHistory.timestamp.desc(), ConvoHistory.turn_id.desc()
+        ).limit(n).subquery()
+        turns = session.execute(
+            select(
+                newest.c.turn_id, newest.c.speaker, newest.c.text, _iso_text(newest.c.timestamp)
+            ).order_by(newest.c.timestamp.asc(), newest.c.turn_id.asc())
+        ).all()
+        
+        return [
+            {
+                "turn_id": turn.turn_id,
+                "speaker": turn.speaker,
+                "text": turn.text,
+                "timestamp": turn.timestamp
+            }
+            for turn in turns
+        ]
     
     def clear_old_conversations(self, days_to_keep: int = 90) -> int:
         """Clear conversation history older than specified days. Returns count of deleted turns."""
-        with self._get_session() as session:
+        with self._write_session() as session:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
             
-            count = session.query(ConvoHistory).filter(
-                ConvoHistory.timestamp < cutoff_date
-            ).count()
-            
-            session.query(ConvoHistory).filter(
-                ConvoHistory.timestamp < cutoff_date
-            ).delete()
+            # One DELETE; its rowcount is the number of turns removed
+            result = session.execute(
+                delete(ConvoHistory).where(ConvoHistory.timestamp < cutoff_date),
+                execution_options={"synchronize_session": False},
+            )
             
             session.commit()
-            return count
+            return result.rowcount
     
     # ------ Utility Methods ------
     
-    def get_context_summary(self) -> Dict[str, Any]:
-        """Get a summary of all stored context for agent prompting."""
-        profile = self.get_profile()
-        goals = self.get_active_goals()
-        current_episodes = self.current_episodes()
-        recent_conversations = self.last_n_turns(10)
+    def _cached_read(self, key: str, build: Callable[[Session], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return build()'s result from cache while no write has happened since it
+        was computed. The short TTL bounds staleness of the time-relative filters
+        (future goals, last-N-days episodes) and of writes made by other processes.
+        """
+        now = time.monotonic()
+        cached = self._read_cache.get(key)
+        if cached is not None and cached[0] == self._write_version and cached[1] > now:
+            return cached[2]
         
-        return {
-            "profile": profile,
-            "active_goals": goals,
-            "current_episodes": current_episodes,
-            "recent_conversations": recent_conversations
-        }
+        # Read the version first: a write landing mid-query bumps it, so the
+        # entry is stale on arrival rather than wrongly fresh
+        version = self._write_version
+        with self._get_session() as session, session.begin():
+            value = build(session)
+        self._read_cache[key] = (version, now + self.SUMMARY_CACHE_TTL_SECONDS, value)
+        return value
+    
+    def get_context_summary(self) -> Dict[str, Any]:
+        """
+        Get a summary of all stored context for agent prompting.
+        The result is cached until the next write; treat it as read-only.
+        """
+        # One session and one read transaction for all four queries
+        return self._cached_read("context_summary", lambda session: {
+            "profile": self._get_profile(session),
+            "active_goals": self._get_active_goals(session),
+            "current_episodes": self._current_episodes(session),
+            "recent_conversations": self._last_n_turns(session, 10)
+        })
+    
+    def get_snapshot(self) -> Dict[str, Any]:
+        """
+        Get everything the agent needs at the start of a conversation
+        (profile, goals, ongoing injuries/fatigue, recent effort and
+        conversations) in a single session.
+        The result is cached until the next write; treat it as read-only.
+        """
+        return self._cached_read("snapshot", lambda session: {
+            "profile": self._get_profile(session),
+            "active_goals": self._get_active_goals(session),
+            "current_injuries": self._current_episodes(session, "injury"),
+            "current_fatigue": self._current_episodes(session, "fatigue"),
+            "recent_efforts": self._get_recent_episodes(session, days=7, topic="effort"),
+            "recent_conversations": self._last_n_turns(session, 10),
+        })
 
 
-# Import fix for datetime
-from datetime import timedelta
+class StoreTransaction:
+    """Write operations bound to one ContextStore.transaction()."""
+    
+    def __init__(self, store: ContextStore, session: Session):
+        self._store = store
+        self._session = session
+    
+    def add_convo_turn(self, speaker: str, text: str, session_id: Optional[str] = None) -> int:
+        """Add a conversation turn, optionally tagged with a chat session. Returns turn_id."""
+        return self._store._add_convo_turns(self._session, [(speaker, text)], session_id)[0]
+    
+    def add_convo_turns(self, turns: List[Tuple[str, str]], session_id: Optional[str] = None) -> List[int]:
+        """Add several (speaker, text) conversation turns. Returns their turn_ids."""
+        if not turns:
+            return []
+        return self._store._add_convo_turns(self._session, turns, session_id)
+    
+    def log_episode(
+        self,
+        topic: str,
+        narrative: str,
+        severity: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> int:
+        """Log a new episode. Returns episode_id."""
+        return self._store._log_episode(self._session, topic, narrative, severity, start_date, end_date)
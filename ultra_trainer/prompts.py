@@ -6,29 +6,15 @@ This module contains the system prompts and prompt templates for the ultra marat
 Keeping prompts in a separate file makes it easier to iterate and modify the coaching style.
 """
 
+import functools
+from typing import Callable, Optional, Union
+
 from langchain_core.prompts import ChatPromptTemplate
 from datetime import datetime
 
 
-def create_agent_prompt(current_location: str = None) -> ChatPromptTemplate:
-    """Create the prompt template for the ultra training agent."""
-    
-    # Get current time context
-    now = datetime.now()
-    current_time_info = f"Current date and time: {now.strftime('%A, %B %d, %Y at %H:%M')}"
-    
-    # Add location-specific context if provided
-    location_context = ""
-    if current_location:
-        if "copenhagen" in current_location.lower():
-            location_context = """
-LOCATION-SPECIFIC CONTEXT (Copenhagen):
-- Copenhill (artificial ski slope/hill) typically closes in the evening
-"""
-        else:
-            location_context = f"\nCURRENT LOCATION: {current_location}"
-    
-    system_message = f"""You are an expert ultra marathon training assistant with access to Strava activity data and persistent memory storage.
+# Static system message; only the time and location slots vary between calls
+SYSTEM_MESSAGE = """You are an expert ultra marathon training assistant with access to Strava activity data and persistent memory storage.
 
 {current_time_info}
 {location_context}
@@ -48,6 +34,7 @@ STRAVA DATA (via tools):
 - Detailed activity metrics (distance, time, elevation, etc.)
 - Activities within specific date ranges
 - Individual activity details
+- Strava API rate limit budget (check before fetching many activities at once)
 
 PERSISTENT MEMORY (via tools):
 - Athlete profile (age, weight, experience, terrain preferences, etc.)
@@ -57,7 +44,7 @@ PERSISTENT MEMORY (via tools):
 - Conversation history and context
 
 IMPORTANT MEMORY USAGE:
-- ALWAYS check conversation_context_tool at the start of conversations to understand what you know about the athlete
+- ALWAYS call athlete_snapshot once at the start of conversations to understand what you know about the athlete (profile, goals, injuries, fatigue, recent effort and conversations) instead of calling the individual tools
 - Use profile_tool to remember/update athlete details (age, experience, goals, etc.)
 - Use goals_tool to track target races and training objectives
 - Use injury_tool and fatigue_tool to monitor athlete health and recovery
@@ -101,9 +88,50 @@ You are a demanding coach with great attention to detail. You are almost surgica
 - You can provide expert advice related to sports science and psychology
 - If you don't have enough information, ask the athlete for more details about their training, goals, and preferences
 """
-    
-    return ChatPromptTemplate.from_messages([
-        ("system", system_message),
-        ("human", "{input}"),
-        ("placeholder", "{agent_scratchpad}"),
-    ])
+
+_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_MESSAGE),
+    ("placeholder", "{chat_history}"),
+    ("human", "{input}"),
+    ("placeholder", "{agent_scratchpad}"),
+])
+
+
+def _current_time_info() -> str:
+    """Describe the current local time; evaluated each time the prompt is formatted."""
+    now = datetime.now()
+    return f"Current date and time: {now.strftime('%A, %B %d, %Y at %H:%M')}"
+
+
+def _location_context(current_location: str = None) -> str:
+    """Build location-specific coaching context."""
+    if not current_location:
+        return ""
+    if "copenhagen" in current_location.lower():
+        return """
+LOCATION-SPECIFIC CONTEXT (Copenhagen):
+- Copenhill (artificial ski slope/hill) typically closes in the evening
+"""
+    return f"\nCURRENT LOCATION: {current_location}"
+
+
+# Only the clock varies between calls for a given location, and it is
+# filled in at format time, so templates are shared per location
+@functools.lru_cache(maxsize=8)
+def create_agent_prompt(
+    current_location: Union[str, Callable[[], Optional[str]], None] = None
+) -> ChatPromptTemplate:
+    """
+    Create the prompt template for the ultra training agent.
+    current_location may be a callable, which is then looked up each time
+    the prompt is formatted so a long-lived agent sees location changes.
+    """
+    if callable(current_location):
+        def location_context() -> str:
+            return _location_context(current_location())
+    else:
+        location_context = _location_context(current_location)
+    return _PROMPT.partial(
+        current_time_info=_current_time_info,
+        location_context=location_context,
+    )
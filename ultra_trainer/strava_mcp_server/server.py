@@ -7,24 +7,44 @@ MCP server for Strava API integration.
 This server exposes methods to query the Strava API for athlete activities.
 """
 
+import asyncio
+import json
 import os
+import random
+import sys
+import threading
 import time
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
+from pathlib import Path
 from typing import Any, Optional
 
 import httpx
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 
-load_dotenv()
-
 
 class StravaClient:
     """Client for interacting with the Strava API."""
 
     BASE_URL = "https://www.strava.com/api/v3"
-
-    def __init__(self, refresh_token: str, client_id: str, client_secret: str):
+    TOKEN_CACHE_DIR = Path.home() / ".ultra_trainer"
+    # Cached tokens with less life than this are refreshed instead of reused
+    TOKEN_MIN_LIFETIME_SECONDS = 300
+    # Strava's short-term limit resets on natural 15-minute boundaries and the
+    # daily limit at midnight UTC
+    RATE_LIMIT_WINDOW_SECONDS = 900
+    MAX_RATE_LIMIT_RETRIES = 3
+    # Longest a request waits for the short-term window to reset; beyond this
+    # the caller gets an error instead of a stalled tool call
+    MAX_RATE_LIMIT_WAIT_SECONDS = 5.0
+
+    def __init__(
+        self,
+        refresh_token: str,
+        client_id: str,
+        client_secret: str,
+        token_cache_path: Optional[Path] = None,
+    ):
         """
         Initialize the Strava API client.
 
@@ -32,21 +52,108 @@ class StravaClient:
             refresh_token: Refresh token for Strava API
             client_id: Client ID for Strava API
             client_secret: Client secret for Strava API
+            token_cache_path: File used to persist the access token across
+                process restarts (default: ~/.ultra_trainer/token_<client_id>.json)
         """
         self.refresh_token = refresh_token
         self.client_id = client_id
         self.client_secret = client_secret
         self.access_token = None
         self.expires_at = 0
-        self.client = httpx.Client(timeout=30.0)
+        self.token_cache_path = token_cache_path or self.TOKEN_CACHE_DIR / f"token_{client_id}.json"
+        # One pooled client for every request so keep-alive connections
+        # (and their TLS sessions) are reused across tool calls
+        self.client = httpx.Client(
+            timeout=30.0,
+            headers={"User-Agent": "ultra-trainer/1.0"},
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+            transport=httpx.HTTPTransport(retries=3),
+        )
+        # Async connections are bound to the event loop that opened them,
+        # so the async client is created lazily per running loop
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_refresh = threading.Event()
+        self._short_usage = 0
+        self._short_limit: Optional[int] = None
+        self._short_reset = 0.0
+        self._long_usage = 0
+        self._long_limit: Optional[int] = None
+        self._long_reset = 0.0
+
+        self._load_cached_token()
+
+    def _load_cached_token(self) -> None:
+        """Reuse a previously persisted access token if it is still valid."""
+        try:
+            token_data = json.loads(self.token_cache_path.read_text())
+            access_token = token_data["access_token"]
+            expires_at = int(token_data["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+
+        if expires_at - time.time() > self.TOKEN_MIN_LIFETIME_SECONDS:
+            self.access_token = access_token
+            self.expires_at = expires_at
+
+    def _save_cached_token(self) -> None:
+        """Atomically persist the current access token with owner-only permissions."""
+        path = self.token_cache_path
+        tmp = path.with_suffix(".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # os.open's mode only applies to new files, so clear any leftover
+            # tmp and create it owner-only before the token is written
+            tmp.unlink(missing_ok=True)
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(json.dumps({"access_token": self.access_token, "expires_at": self.expires_at}))
+            tmp.replace(path)
+        except OSError:
+            # The cache is an optimization only; never fail a request over it
+            pass
 
     def _ensure_valid_token(self) -> None:
         """Ensure we have a valid access token, refreshing if necessary."""
         current_time = int(time.time())
 
-        # If token is missing or expired, refresh it
+        # If token is missing or expired, refresh it. The background refresher
+        # normally gets there first; this is the fallback (e.g. clock skew).
         if not self.access_token or current_time >= self.expires_at:
-            self._refresh_token()
+            with self._refresh_lock:
+                if not self.access_token or int(time.time()) >= self.expires_at:
+                    self._refresh_token()
+
+    def start_background_refresh(self) -> None:
+        """Refresh the token in a daemon thread shortly before it expires."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, name="strava-token-refresh", daemon=True
+        )
+        self._refresh_thread.start()
+
+    def _refresh_loop(self) -> None:
+        """Keep the access token fresh until close() is called."""
+        while not self._stop_refresh.is_set():
+            delay = max(0.0, self.expires_at - time.time() - self.TOKEN_MIN_LIFETIME_SECONDS)
+            if self._stop_refresh.wait(delay):
+                break
+
+            try:
+                with self._refresh_lock:
+                    if self.expires_at - time.time() <= self.TOKEN_MIN_LIFETIME_SECONDS:
+                        self._refresh_token()
+            except Exception as e:
+                # Inline refresh in _ensure_valid_token still covers requests.
+                # stdout carries the MCP stdio protocol, so report on stderr
+                print(f"Background token refresh failed: {e}", file=sys.stderr)
+                if self._stop_refresh.wait(60):
+                    break
 
     def _refresh_token(self) -> None:
         """Refresh the access token using the refresh token."""
@@ -66,7 +173,70 @@ class StravaClient:
         token_data = response.json()
         self.access_token = token_data["access_token"]
         self.expires_at = token_data["expires_at"]
-        print("Token refreshed successfully")
+        self._save_cached_token()
+        print("Token refreshed successfully", file=sys.stderr)
+
+    def _update_rate_limits(self, response: httpx.Response) -> None:
+        """Record usage from Strava's X-RateLimit-Usage / X-RateLimit-Limit headers."""
+        usage = response.headers.get("X-RateLimit-Usage")
+        limit = response.headers.get("X-RateLimit-Limit")
+        if not usage or not limit:
+            return
+
+        try:
+            short_usage, long_usage = (int(value) for value in usage.split(","))
+            short_limit, long_limit = (int(value) for value in limit.split(","))
+        except ValueError:
+            return
+
+        now = time.time()
+        window = self.RATE_LIMIT_WINDOW_SECONDS
+        self._short_usage, self._short_limit = short_usage, short_limit
+        self._short_reset = (now // window + 1) * window
+        self._long_usage, self._long_limit = long_usage, long_limit
+        self._long_reset = (now // 86400 + 1) * 86400
+
+    def _rate_limit_delay(self) -> float:
+        """Seconds to wait before the next request so the short-term limit is not hit."""
+        now = time.time()
+        if self._long_limit is not None and now < self._long_reset and self._long_usage >= self._long_limit:
+            raise Exception("Strava daily rate limit reached. Please try again tomorrow.")
+
+        if self._short_limit is not None and now < self._short_reset and self._short_limit - self._short_usage <= 1:
+            delay = self._short_reset - now
+            if delay > self.MAX_RATE_LIMIT_WAIT_SECONDS:
+                raise Exception(
+                    "Strava 15-minute rate limit reached. "
+                    f"Please try again in {int(delay // 60) + 1} minutes."
+                )
+            return delay
+        return 0.0
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Delay before retrying a 429, honouring Retry-After when present."""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+            if delay > self.MAX_RATE_LIMIT_WAIT_SECONDS:
+                raise Exception(
+                    "Strava rate limit reached. "
+                    f"Please try again in {int(delay // 60) + 1} minutes."
+                )
+            return delay
+        return min(60, 2**attempt) + random.random() * 0.5
+
+    def get_rate_limit_status(self) -> dict:
+        """Get the most recently observed Strava API rate limit usage."""
+        now = time.time()
+        short_current = now < self._short_reset
+        long_current = now < self._long_reset
+        return {
+            "short_term_usage": self._short_usage if short_current else 0,
+            "short_term_limit": self._short_limit,
+            "short_term_resets_in_seconds": int(self._short_reset - now) if short_current else None,
+            "daily_usage": self._long_usage if long_current else 0,
+            "daily_limit": self._long_limit,
+        }
 
     def _make_request(self, endpoint: str, params: Optional[dict] = None) -> Any:
         """Make an authenticated request to the Strava API."""
@@ -75,7 +245,58 @@ class StravaClient:
         url = f"{self.BASE_URL}/{endpoint}"
         headers = {"Authorization": f"Bearer {self.access_token}"}
 
-        response = self.client.get(url, headers=headers, params=params)
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            delay = self._rate_limit_delay()
+            if delay:
+                time.sleep(delay)
+
+            response = self.client.get(url, headers=headers, params=params)
+            self._update_rate_limits(response)
+            if response.status_code != 429 or attempt == self.MAX_RATE_LIMIT_RETRIES:
+                break
+            time.sleep(self._retry_delay(response, attempt))
+
+        if response.status_code != 200:
+            error_msg = f"Error {response.status_code}: {response.text}"
+            raise Exception(error_msg)
+
+        return response.json()
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Get the async HTTP client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            if self._async_client is not None and not self._async_client_loop.is_closed():
+                # Close the previous loop's client on that loop instead of leaking it
+                asyncio.run_coroutine_threadsafe(self._async_client.aclose(), self._async_client_loop)
+            self._async_client = httpx.AsyncClient(
+                timeout=10.0,
+                headers={"User-Agent": "ultra-trainer/1.0"},
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                transport=httpx.AsyncHTTPTransport(retries=3),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def _amake_request(self, endpoint: str, params: Optional[dict] = None) -> Any:
+        """Make an authenticated request to the Strava API without blocking the event loop."""
+        if not self.access_token or int(time.time()) >= self.expires_at:
+            await asyncio.to_thread(self._ensure_valid_token)
+
+        url = f"{self.BASE_URL}/{endpoint}"
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            delay = self._rate_limit_delay()
+            if delay:
+                await asyncio.sleep(delay)
+
+            response = await self._get_async_client().get(url, headers=headers, params=params)
+            self._update_rate_limits(response)
+            if response.status_code != 429 or attempt == self.MAX_RATE_LIMIT_RETRIES:
+                break
+            await asyncio.sleep(self._retry_delay(response, attempt))
+
         if response.status_code != 200:
             error_msg = f"Error {response.status_code}: {response.text}"
             raise Exception(error_msg)
@@ -107,6 +328,21 @@ class StravaClient:
         activities = self._make_request("athlete/activities", params)
         return self._filter_activities(activities)
 
+    async def aget_activities(
+        self, limit: int = 10, before: Optional[int] = None, after: Optional[int] = None
+    ) -> list:
+        """Async variant of get_activities."""
+        params = {"per_page": limit}
+
+        if before:
+            params["before"] = before
+
+        if after:
+            params["after"] = after
+
+        activities = await self._amake_request("athlete/activities", params)
+        return self._filter_activities(activities)
+
     def get_activity(self, activity_id: int) -> dict:
         """
         Get detailed information about a specific activity.
@@ -120,6 +356,11 @@ class StravaClient:
         activity = self._make_request(f"activities/{activity_id}")
         return self._filter_activity(activity)
 
+    async def aget_activity(self, activity_id: int) -> dict:
+        """Async variant of get_activity."""
+        activity = await self._amake_request(f"activities/{activity_id}")
+        return self._filter_activity(activity)
+
     def _filter_activity(self, activity: dict) -> dict:
         """Filter activity to only include specific keys and rename with units."""
         # Define field mappings with units
@@ -189,9 +430,18 @@ class StravaClient:
         return [self._filter_activity(activity) for activity in activities]
 
     def close(self) -> None:
-        """Close the HTTP client."""
+        """Stop the background refresher and close the HTTP client."""
+        self._stop_refresh.set()
         self.client.close()
 
+    async def aclose(self) -> None:
+        """Close the HTTP clients, including the async client of the running loop."""
+        self.close()
+        if self._async_client is not None and self._async_client_loop is asyncio.get_running_loop():
+            await self._async_client.aclose()
+        self._async_client = None
+        self._async_client_loop = None
+
 
 def timestamp_to_date(timestamp: int) -> date:
     """
@@ -220,6 +470,21 @@ def date_to_timestamp(date_obj: date) -> int:
     return int(dt.timestamp())
 
 
+def days_ago_timestamp(days: int) -> int:
+    """
+    Get the Unix timestamp for a number of days ago, rounded down to the
+    minute so calls made close together send identical queries.
+
+    Args:
+        days: Number of days to look back
+
+    Returns:
+        Unix timestamp
+    """
+    after = int(time.time()) - days * 86400
+    return after - after % 60
+
+
 def parse_date(date_str: str) -> date:
     """
     Parse a date string in ISO format (YYYY-MM-DD).
@@ -236,21 +501,14 @@ def parse_date(date_str: str) -> date:
         raise ValueError(f"Invalid date format: {date_str}. Expected format: YYYY-MM-DD") from err
 
 
-# Create MCP server and StravaClient at module level
+# Create MCP server at module level; the StravaClient is created in main()
+# (or assigned by the agent) so importing this module has no side effects
 mcp = FastMCP("Strava API MCP Server")
 
-# Default tokens (will be overridden in main or by direct assignment)
-default_refresh_token = os.environ.get("STRAVA_REFRESH_TOKEN")
-default_client_id = os.environ.get("STRAVA_CLIENT_ID")
-default_client_secret = os.environ.get("STRAVA_CLIENT_SECRET")
-
 strava_client = None
-if default_refresh_token and default_client_id and default_client_secret:
-    strava_client = StravaClient(default_refresh_token, default_client_id, default_client_secret)
 
 
-# Add tools for querying activities
-@mcp.tool()
+# Tools for querying activities (the MCP server registers their async variants below)
 def get_activities(limit: int = 10) -> dict[str, Any]:
     """
     Get the authenticated athlete's recent activities.
@@ -273,7 +531,6 @@ def get_activities(limit: int = 10) -> dict[str, Any]:
         return {"error": str(e)}
 
 
-@mcp.tool()
 def get_activities_by_date_range(start_date: str, end_date: str, limit: int = 30) -> dict[str, Any]:
     """
     Get activities within a specific date range.
@@ -305,7 +562,6 @@ def get_activities_by_date_range(start_date: str, end_date: str, limit: int = 30
         return {"error": str(e)}
 
 
-@mcp.tool()
 def get_activity_by_id(activity_id: int) -> dict[str, Any]:
     """
     Get detailed information about a specific activity.
@@ -328,14 +584,14 @@ def get_activity_by_id(activity_id: int) -> dict[str, Any]:
         return {"error": str(e)}
 
 
-@mcp.tool()
-def get_recent_activities(days: int = 7, limit: int = 10) -> dict[str, Any]:
+def get_recent_activities(days: int = 7, limit: int = 10, after: Optional[int] = None) -> dict[str, Any]:
     """
     Get activities from the past X days.
 
     Args:
         days: Number of days to look back (default: 7)
         limit: Maximum number of activities to return (default: 10)
+        after: Precomputed Unix timestamp to use instead of deriving it from days
 
     Returns:
         Dictionary containing activities data
@@ -346,10 +602,8 @@ def get_recent_activities(days: int = 7, limit: int = 10) -> dict[str, Any]:
         }
 
     try:
-        # Calculate timestamp for X days ago
-        now = datetime.now()
-        days_ago = now - timedelta(days=days)
-        after = int(days_ago.timestamp())
+        if after is None:
+            after = days_ago_timestamp(days)
 
         activities = strava_client.get_activities(limit=limit, after=after)
         return {"data": activities}
@@ -357,9 +611,118 @@ def get_recent_activities(days: int = 7, limit: int = 10) -> dict[str, Any]:
         return {"error": str(e)}
 
 
+@mcp.tool()
+def get_rate_limit_status() -> dict[str, Any]:
+    """
+    Get the current Strava API rate limit usage.
+
+    Returns:
+        Dictionary containing short-term (15 minute) and daily usage and limits
+    """
+    if strava_client is None:
+        return {
+            "error": "Strava client not initialized. Please provide refresh token, client ID, and client secret."  # noqa: E501
+        }
+
+    return {"data": strava_client.get_rate_limit_status()}
+
+
+# Async counterparts of the tools above, used by the LangChain agent so
+# independent Strava calls can run concurrently on one event loop. They are
+# also what the MCP server exposes, so a slow Strava request doesn't block
+# the server's event loop
+@mcp.tool(name="get_activities", description=get_activities.__doc__)
+async def aget_activities(limit: int = 10) -> dict[str, Any]:
+    """Async variant of get_activities."""
+    if strava_client is None:
+        return {
+            "error": "Strava client not initialized. Please provide refresh token, client ID, and client secret."  # noqa: E501
+        }
+
+    try:
+        activities = await strava_client.aget_activities(limit=limit)
+        return {"data": activities}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool(name="get_activities_by_date_range", description=get_activities_by_date_range.__doc__)
+async def aget_activities_by_date_range(start_date: str, end_date: str, limit: int = 30) -> dict[str, Any]:
+    """Async variant of get_activities_by_date_range."""
+    if strava_client is None:
+        return {
+            "error": "Strava client not initialized. Please provide refresh token, client ID, and client secret."  # noqa: E501
+        }
+
+    try:
+        start = parse_date(start_date)
+        end = parse_date(end_date)
+
+        # Convert dates to timestamps
+        after = int(datetime.combine(start, datetime.min.time()).timestamp())
+        before = int(datetime.combine(end, datetime.max.time()).timestamp())
+
+        activities = await strava_client.aget_activities(limit=limit, before=before, after=after)
+        return {"data": activities}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool(name="get_activity_by_id", description=get_activity_by_id.__doc__)
+async def aget_activity_by_id(activity_id: int) -> dict[str, Any]:
+    """Async variant of get_activity_by_id."""
+    if strava_client is None:
+        return {
+            "error": "Strava client not initialized. Please provide refresh token, client ID, and client secret."  # noqa: E501
+        }
+
+    try:
+        activity = await strava_client.aget_activity(activity_id)
+        return {"data": activity}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def aget_recent_activities(days: int = 7, limit: int = 10, after: Optional[int] = None) -> dict[str, Any]:
+    """Async variant of get_recent_activities."""
+    if strava_client is None:
+        return {
+            "error": "Strava client not initialized. Please provide refresh token, client ID, and client secret."  # noqa: E501
+        }
+
+    try:
+        if after is None:
+            after = days_ago_timestamp(days)
+
+        activities = await strava_client.aget_activities(limit=limit, after=after)
+        return {"data": activities}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# The precomputed after timestamp is an internal shortcut for the agent's
+# cache; MCP clients only choose days and limit
+@mcp.tool(name="get_recent_activities")
+async def _mcp_get_recent_activities(days: int = 7, limit: int = 10) -> dict[str, Any]:
+    """
+    Get activities from the past X days.
+
+    Args:
+        days: Number of days to look back (default: 7)
+        limit: Maximum number of activities to return (default: 10)
+
+    Returns:
+        Dictionary containing activities data
+    """
+    return await aget_recent_activities(days=days, limit=limit)
+
+
 def main() -> None:
     """Main function to start the Strava MCP server."""
-    print("Starting Strava MCP server!")
+    # stdout is reserved for the MCP stdio protocol
+    print("Starting Strava MCP server!", file=sys.stderr)
+
+    load_dotenv()
 
     # Initialize Strava client if not already done
     global strava_client
@@ -372,9 +735,13 @@ def main() -> None:
             strava_client = StravaClient(refresh_token, client_id, client_secret)
         else:
             print(
-                "Warning: Strava client not initialized. Please set STRAVA_REFRESH_TOKEN, STRAVA_CLIENT_ID, and STRAVA_CLIENT_SECRET environment variables."  # noqa: E501
+                "Warning: Strava client not initialized. Please set STRAVA_REFRESH_TOKEN, STRAVA_CLIENT_ID, and STRAVA_CLIENT_SECRET environment variables.",  # noqa: E501
+                file=sys.stderr,
             )
 
+    if strava_client is not None:
+        strava_client.start_background_refresh()
+
     mcp.run(transport="stdio")
 
 